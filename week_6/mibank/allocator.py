@@ -0,0 +1,99 @@
+import json
+import os
+import random
+
+FIRST = 1000000000
+LAST = 9999999999
+SIZE = LAST - FIRST + 1
+
+# 2 ** 34 is the smallest even power of two above SIZE, so the Feistel network
+# splits it into two 17-bit halves.
+HALF_BITS = 17
+HALF_MASK = (1 << HALF_BITS) - 1
+ROUNDS = 4
+
+# Counters are reserved from the file this many at a time, so most
+# allocations never touch the disk.
+BLOCK = 1000
+
+
+def permute(counter, keys):
+    # A Feistel network is a bijection on 34-bit numbers whatever the round
+    # function, so distinct counters always give distinct results.
+    left, right = counter >> HALF_BITS, counter & HALF_MASK
+    for key in keys:
+        left, right = right, left ^ (((right * 0x9E3779B1) ^ key) * 0x85EBCA6B >> 7 & HALF_MASK)
+    return left << HALF_BITS | right
+
+
+class AccountNumberAllocator:
+    def __init__(self, name_of_file, lock, is_taken):
+        self.name_of_file = name_of_file
+        self.lock = lock
+        # Older accounts got random numbers, so skip any the store already has.
+        self.is_taken = is_taken
+
+        self.keys = None
+        self.next = 0
+        self.reserved = 0
+
+    def load(self):
+        if os.path.exists(self.name_of_file):
+            with open(self.name_of_file) as store:
+                state = json.loads(store.read())
+        else:
+            state = {"keys": [random.getrandbits(32) for _ in range(ROUNDS)], "next": 0}
+        return state
+
+    def reserve(self, count):
+        # The file holds the first counter nobody has been given yet. A crash
+        # wastes the rest of a reserved block but never hands a counter out twice.
+        with self.lock:
+            state = self.load()
+            self.keys = state["keys"]
+            self.next = state["next"]
+            self.reserved = self.next + count
+
+            if self.reserved > SIZE:
+                raise ValueError("No account numbers left to allocate.")
+
+            temporary = self.name_of_file + ".tmp"
+            with open(temporary, "w") as store:
+                store.write(json.dumps({"keys": self.keys, "next": self.reserved}))
+            os.replace(temporary, self.name_of_file)
+
+    def number(self, counter):
+        # Cycle-walk: a permuted value past SIZE is permuted again until it
+        # lands in range. That keeps it a bijection on 0..SIZE-1.
+        value = permute(counter, self.keys)
+        while value >= SIZE:
+            value = permute(value, self.keys)
+        return FIRST + value
+
+    def allocate(self):
+        # The store's lock also keeps threads of this process from taking the
+        # same counter. It is re-entrant, so reserve() can take it again.
+        with self.lock:
+            while True:
+                if self.next >= self.reserved:
+                    self.reserve(BLOCK)
+
+                account_no = self.number(self.next)
+                self.next += 1
+                if not self.is_taken(account_no):
+                    return account_no
+
+    def allocate_many(self, count):
+        numbers = []
+        with self.lock:
+            while len(numbers) < count:
+                missing = count - len(numbers)
+                if self.reserved - self.next < missing:
+                    self.reserve(missing)
+
+                for counter in range(self.next, self.next + missing):
+                    account_no = self.number(counter)
+                    if not self.is_taken(account_no):
+                        numbers.append(account_no)
+                self.next += missing
+        return numbers
@@ -0,0 +1,199 @@
+import argparse
+import json
+import math
+import sys
+import time
+
+import config
+import metrics
+from allocator import FIRST, LAST
+from repository import AccountRepository
+
+ENCODER = json.JSONEncoder(check_circular=False)
+NOT_AN_AMOUNT = {"ok": False, "error": "Amount must be a positive number."}
+
+
+def amount_of(operation):
+    # The amount as a float, or None unless it is a finite number above zero.
+    try:
+        amount = float(operation["amount"])
+    except (ValueError, TypeError, OverflowError):
+        return None
+    return amount if math.isfinite(amount) and amount > 0 else None
+
+
+class Batch:
+    def __init__(self, repository, save_every=0):
+        self.repository = repository
+        # 0 means persist once, after the last operation.
+        self.save_every = save_every
+        self.applied = 0
+        self.failed = 0
+
+    def register(self, operation):
+        if not isinstance(operation["name"], str) or not isinstance(operation["email"], str):
+            return {"ok": False, "error": "Name and email must be text."}
+
+        account_no = operation.get("account_number")
+        if account_no is None:
+            account_no = self.repository.allocator.allocate()
+        elif type(account_no) is not int or not FIRST <= account_no <= LAST:
+            return {"ok": False, "error": f"Account number must be a whole number from {FIRST} to {LAST}."}
+        elif self.repository.find(account_no) is not None:
+            return {"ok": False, "error": "Account number already exists."}
+
+        if not self.repository.add({"name": operation["name"], "email": operation["email"],
+                                    "account_number": account_no, "account_balance": 0}):
+            return {"ok": False, "error": "An account with this email already exists."}
+        return {"ok": True, "account_number": account_no}
+
+    def deposit(self, operation):
+        user = self.repository.find(operation["account_number"])
+        if user is None:
+            return {"ok": False, "error": "No such account number was found."}
+
+        amount = amount_of(operation)
+        if amount is None:
+            return NOT_AN_AMOUNT
+        self.repository.deposit(user, amount)
+        return {"ok": True, "account_balance": user["account_balance"]}
+
+    def withdraw(self, operation):
+        user = self.repository.find(operation["account_number"])
+        if user is None:
+            return {"ok": False, "error": "No such account number was found."}
+
+        amount = amount_of(operation)
+        if amount is None:
+            return NOT_AN_AMOUNT
+        if not self.repository.withdraw(user, amount):
+            return {"ok": False, "error": "Insufficient funds."}
+        return {"ok": True, "account_balance": user["account_balance"]}
+
+    def transfer(self, operation):
+        sender = self.repository.find(operation["sender"])
+        if sender is None:
+            return {"ok": False, "error": "Sender account not found."}
+
+        receiver = self.repository.find(operation["receiver"])
+        if receiver is None:
+            return {"ok": False, "error": "Receiver account not found."}
+
+        amount = amount_of(operation)
+        if amount is None:
+            return NOT_AN_AMOUNT
+        if not self.repository.transfer(sender, receiver, amount):
+            return {"ok": False, "error": "Insufficient funds."}
+        return {"ok": True, "account_balance": sender["account_balance"]}
+
+    def apply(self, operation):
+        match operation.get("op"):
+            case "register":
+                result = self.register(operation)
+            case "deposit":
+                result = self.deposit(operation)
+            case "withdraw":
+                result = self.withdraw(operation)
+            case "transfer":
+                result = self.transfer(operation)
+            case other:
+                result = {"ok": False, "error": f"Unknown operation: {other}"}
+
+        if result["ok"]:
+            self.applied += 1
+        else:
+            self.failed += 1
+
+        if self.save_every and (self.applied + self.failed) % self.save_every == 0:
+            self.repository.flush()
+        return result
+
+    def parse(self, chunk):
+        # One json.loads over the whole chunk is about twice as fast as one per
+        # line. Fall back to line by line only when the chunk has a bad line.
+        try:
+            return json.loads("[" + ",".join(line for _, line in chunk) + "]")
+        except ValueError:
+            pass
+
+        operations = []
+        for _, line in chunk:
+            try:
+                operations.append(json.loads(line))
+            except ValueError as error:
+                operations.append(error)
+        return operations
+
+    def run(self, lines, results=None, chunk_size=10_000):
+        # Hold the store for the whole batch; the operations inside re-enter the
+        # lock without touching the file again.
+        with self.repository.commit_lock:
+            self.repository.refresh()
+
+            chunk = []
+            for number, line in enumerate(lines, start=1):
+                if line.strip():
+                    chunk.append((number, line))
+                if len(chunk) >= chunk_size:
+                    self.run_chunk(chunk, results)
+                    chunk = []
+            if chunk:
+                self.run_chunk(chunk, results)
+
+            self.repository.flush()
+        self.repository.wait()
+
+    def run_chunk(self, chunk, results):
+        output = []
+        for (number, _), operation in zip(chunk, self.parse(chunk)):
+            try:
+                if isinstance(operation, Exception):
+                    raise operation
+                result = self.apply(operation)
+            except Exception as error:
+                # One bad operation is a failed row, never the end of the run.
+                self.failed += 1
+                result = {"ok": False, "error": f"Bad operation: {error!r}"}
+
+            if results is not None:
+                result["line"] = number
+                output.append(ENCODER.encode(result))
+
+        if output:
+            results.write("\n".join(output) + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply a JSONL file of mibank operations.")
+    parser.add_argument("operations", help="JSONL file, one operation per line")
+    parser.add_argument("--store", default="store.json")
+    parser.add_argument("--save-every", type=int, default=0,
+                        help="persist after this many operations (default: once at the end)")
+    parser.add_argument("--results", help="write one JSON result per operation to this file")
+    arguments = parser.parse_args()
+    if config.BACKEND != "json":
+        # A batch holds AccountRepository's lock for the whole run with autosave
+        # off. Other backends have neither, and their handlers never read store.json.
+        sys.exit(f"Batch mode needs the json backend; config.BACKEND is {config.BACKEND!r}")
+    metrics.install()
+
+    start = time.perf_counter()
+    batch = Batch(AccountRepository(name_of_file=arguments.store, autosave=False),
+                  save_every=arguments.save_every)
+
+    results = open(arguments.results, "w") if arguments.results else None
+    try:
+        with open(arguments.operations) as operations:
+            batch.run(operations, results=results)
+    finally:
+        if results is not None:
+            results.close()
+
+    elapsed = time.perf_counter() - start
+    total = batch.applied + batch.failed
+    print(f"{total} operations: {batch.applied} applied, {batch.failed} failed "
+          f"in {elapsed:.2f}s ({total / elapsed:,.0f} ops/s)")
+
+
+if __name__ == "__main__":
+    main()
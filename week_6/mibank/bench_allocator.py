@@ -0,0 +1,42 @@
+import os
+import sys
+import tempfile
+import time
+
+from repository import AccountRepository
+from synthetic import write_store
+
+EXISTING = 100_000
+ONBOARD = 1_000_000
+
+
+def main(count):
+    with tempfile.TemporaryDirectory() as folder:
+        name_of_file = os.path.join(folder, "store.json")
+        write_store(name_of_file, EXISTING)
+        repository = AccountRepository(name_of_file=name_of_file)
+
+        start = time.perf_counter()
+        numbers = repository.allocator.allocate_many(count)
+        allocated = time.perf_counter() - start
+
+        start = time.perf_counter()
+        repository.add_many([{"name": f"new{position}", "email": f"new{position}@mibank.test",
+                              "account_number": account_no, "account_balance": 0}
+                             for position, account_no in enumerate(numbers)])
+        added = time.perf_counter() - start
+
+        start = time.perf_counter()
+        singles = [repository.allocator.allocate() for _ in range(100_000)]
+        single_us = (time.perf_counter() - start) / len(singles) * 1_000_000
+
+        unique = len(set(numbers) | set(singles)) == count + len(singles)
+        total = len(repository.index)
+
+    print(f"bulk allocate {count}: {allocated:.2f}s, add_many: {added:.2f}s, "
+          f"single allocate: {single_us:.2f}us each")
+    print(f"{total} accounts in store, all new numbers unique: {unique}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else ONBOARD)
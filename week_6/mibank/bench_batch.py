@@ -0,0 +1,52 @@
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+from batch import Batch
+from repository import AccountRepository
+from synthetic import write_store
+
+ACCOUNTS = 100_000
+OPERATIONS = 1_000_000
+
+
+def make_operations(accounts, count, seed=2025):
+    generator = random.Random(seed)
+    numbers = [user["account_number"] for user in accounts]
+    operations = []
+    for position in range(count):
+        kind = generator.random()
+        amount = generator.randint(1, 500)
+        if kind < 0.01:
+            operation = {"op": "register", "name": f"batch{position}", "email": f"batch{position}@mibank.test"}
+        elif kind < 0.4:
+            operation = {"op": "deposit", "account_number": generator.choice(numbers), "amount": amount}
+        elif kind < 0.6:
+            operation = {"op": "withdraw", "account_number": generator.choice(numbers), "amount": amount}
+        else:
+            operation = {"op": "transfer", "sender": generator.choice(numbers),
+                         "receiver": generator.choice(numbers), "amount": amount}
+        operations.append(json.dumps(operation) + "\n")
+    return operations
+
+
+def main(count):
+    with tempfile.TemporaryDirectory() as folder:
+        name_of_file = os.path.join(folder, "store.json")
+        operations = make_operations(write_store(name_of_file, ACCOUNTS), count)
+
+        start = time.perf_counter()
+        batch = Batch(AccountRepository(name_of_file=name_of_file, autosave=False))
+        with open(os.path.join(folder, "results.jsonl"), "w") as results:
+            batch.run(operations, results=results)
+        elapsed = time.perf_counter() - start
+
+    print(f"{count} operations on {ACCOUNTS} accounts: {batch.applied} applied, "
+          f"{batch.failed} failed, {elapsed:.2f}s, {count / elapsed:,.0f} ops/s")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else OPERATIONS)
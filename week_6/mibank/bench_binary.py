@@ -0,0 +1,62 @@
+import os
+import random
+import sys
+import tempfile
+import time
+
+from binary_store import BinaryStore, write_binary
+from model import Model
+from synthetic import make_accounts
+
+SIZES = [10_000, 100_000, 1_000_000]
+LOOKUPS = 10_000
+
+
+def model_balance(name_of_file, account_no):
+    for user in Model.load_a_file(name_of_file=name_of_file):
+        if int(account_no) == user['account_number']:
+            return user['account_balance']
+
+
+def main(sizes):
+    print(f"{'accounts':>10} {'json MB':>8} {'bin MB':>7} {'Model read (ms)':>16} "
+          f"{'mmap open+read (ms)':>20} {'mmap read (us)':>15} {'mmap update (us)':>17}")
+    with tempfile.TemporaryDirectory() as folder:
+        for size in sizes:
+            accounts = make_accounts(size)
+            json_file = os.path.join(folder, f"store_{size}.json")
+            binary_file = os.path.join(folder, f"store_{size}.bin")
+            Model.save_a_file(name_of_file=json_file, content=accounts)
+            write_binary(binary_file, accounts)
+
+            account_no = accounts[-1]["account_number"]
+
+            # Cold path: what ViewBalance does today versus opening the binary file.
+            start = time.perf_counter()
+            model_balance(json_file, account_no)
+            model_ms = (time.perf_counter() - start) * 1000
+
+            start = time.perf_counter()
+            store = BinaryStore(binary_file)
+            store.balance(account_no)
+            open_ms = (time.perf_counter() - start) * 1000
+
+            numbers = [user["account_number"] for user in random.choices(accounts, k=LOOKUPS)]
+            start = time.perf_counter()
+            for number in numbers:
+                store.balance(number)
+            read_us = (time.perf_counter() - start) / LOOKUPS * 1_000_000
+
+            users = [store.find(number) for number in numbers]
+            start = time.perf_counter()
+            for user in users:
+                store.deposit(user, 1.0)
+            update_us = (time.perf_counter() - start) / LOOKUPS * 1_000_000
+            store.close()
+
+            print(f"{size:>10} {os.path.getsize(json_file) / 1e6:>8.1f} {os.path.getsize(binary_file) / 1e6:>7.1f} "
+                  f"{model_ms:>16.1f} {open_ms:>20.3f} {read_us:>15.2f} {update_us:>17.2f}")
+
+
+if __name__ == "__main__":
+    main([int(size) for size in sys.argv[1:]] or SIZES)
@@ -0,0 +1,78 @@
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+from checkpoint import columns_of
+from repository import AccountRepository
+from synthetic import write_store
+
+
+def restart(name_of_file, checkpoints):
+    start = time.perf_counter()
+    repository = AccountRepository(name_of_file=name_of_file, checkpoints=checkpoints)
+    print(json.dumps({"seconds": time.perf_counter() - start, "accounts": len(repository.index)}))
+
+
+def timed_restart(name_of_file, checkpoints):
+    # A fresh process, as after a crash.
+    output = subprocess.run([sys.executable, __file__, "--restart", str(checkpoints), name_of_file],
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output)["seconds"]
+
+
+def churn(repository, count, seed):
+    generator = random.Random(seed)
+    numbers = list(repository.index)
+    for _ in range(count):
+        repository.deposit(repository.find(generator.choice(numbers)), 1.0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Restart time with and without checkpoints.")
+    parser.add_argument("--accounts", type=int, default=1_000_000)
+    parser.add_argument("--tail", type=int, default=100_000, help="journal records since the last snapshot")
+    parser.add_argument("--restart", nargs=2, help=argparse.SUPPRESS)
+    arguments = parser.parse_args()
+
+    if arguments.restart:
+        restart(arguments.restart[1], arguments.restart[0] == "True")
+        return
+
+    with tempfile.TemporaryDirectory() as folder:
+        plain = os.path.join(folder, "plain.json")
+        write_store(plain, arguments.accounts)
+        repository = AccountRepository(name_of_file=plain, checkpoints=False,
+                                       compact_every=arguments.tail + 1)
+        churn(repository, arguments.tail, seed=1)
+        without = timed_restart(plain, False)
+
+        checkpointed = os.path.join(folder, "checkpointed.json")
+        write_store(checkpointed, arguments.accounts)
+        repository = AccountRepository(name_of_file=checkpointed, checkpoints=True)
+
+        start = time.perf_counter()
+        # What checkpoint() does while it holds the commit lock.
+        with repository.commit_lock:
+            columns_of(repository.accounts)
+        pause = time.perf_counter() - start
+
+        start = time.perf_counter()
+        repository.checkpoint(background=False)
+        written = time.perf_counter() - start
+
+        churn(repository, arguments.tail, seed=1)
+        with_checkpoint = timed_restart(checkpointed, True)
+
+    print(f"{arguments.accounts} accounts, {arguments.tail} journal records since the last snapshot")
+    print(f"restart without checkpoints (store.json + journal): {without:.2f}s")
+    print(f"restart with checkpoint (checkpoint + journal tail): {with_checkpoint:.2f}s")
+    print(f"checkpoint: writers paused {pause * 1000:.0f}ms for the copy, {written:.2f}s to write in total")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+import os
+import sys
+import tempfile
+import time
+
+from model import Model
+from serialization import CODECS
+from synthetic import make_accounts
+
+ACCOUNTS = 1_000_000
+
+
+def main(count):
+    accounts = make_accounts(count)
+    print(f"{count} accounts")
+    print(f"{'codec':>8} {'encode+write (s)':>17} {'load (s)':>9} {'stream (s)':>11} {'size (MB)':>10}")
+    with tempfile.TemporaryDirectory() as folder:
+        for name in CODECS:
+            name_of_file = os.path.join(folder, f"store.{name}")
+
+            start = time.perf_counter()
+            Model.save_a_file(name_of_file=name_of_file, content=accounts, codec=name)
+            saved = time.perf_counter() - start
+
+            start = time.perf_counter()
+            loaded = Model.load_a_file(name_of_file=name_of_file)
+            load = time.perf_counter() - start
+
+            start = time.perf_counter()
+            streamed = sum(1 for _ in Model.stream_a_file(name_of_file=name_of_file))
+            stream = time.perf_counter() - start
+
+            if loaded != accounts or streamed != count:
+                raise SystemExit(f"{name} did not round-trip")
+            size = os.path.getsize(name_of_file) / (1024 * 1024)
+            print(f"{name:>8} {saved:>17.2f} {load:>9.2f} {stream:>11.2f} {size:>10.1f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else ACCOUNTS)
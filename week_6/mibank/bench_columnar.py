@@ -0,0 +1,31 @@
+import sys
+import time
+
+import numpy as np
+
+from columnar import BalanceTable
+
+SIZES = [1_000_000, 10_000_000]
+
+
+def timed_ms(report):
+    start = time.perf_counter()
+    report()
+    return (time.perf_counter() - start) * 1000
+
+
+def main(sizes):
+    print(f"{'accounts':>10} {'total':>9} {'zero count':>11} {'top 10':>9} {'histogram':>10}  (ms)")
+    generator = np.random.default_rng(2025)
+    for size in sizes:
+        # Columns are filled directly: 10M account dicts would not fit here.
+        table = BalanceTable()
+        table.load_columns(generator.choice(9_000_000_000, size, replace=False) + 1_000_000_000,
+                           generator.integers(0, 100_000, size).astype(np.float64))
+
+        print(f"{size:>10} {timed_ms(table.total):>9.1f} {timed_ms(table.zero_balance_count):>11.1f} "
+              f"{timed_ms(lambda: table.top(10)):>9.1f} {timed_ms(table.histogram):>10.1f}")
+
+
+if __name__ == "__main__":
+    main([int(size) for size in sys.argv[1:]] or SIZES)
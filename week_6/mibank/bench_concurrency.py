@@ -0,0 +1,69 @@
+import argparse
+import multiprocessing
+import os
+import random
+import tempfile
+import threading
+import time
+
+from repository import AccountRepository
+from synthetic import write_store
+
+
+def worker_threads(name_of_file, threads, transfers, seed):
+    repository = AccountRepository(name_of_file=name_of_file)
+    numbers = list(repository.index)
+    done = []
+
+    def transfer_many(thread_seed):
+        generator = random.Random(thread_seed)
+        succeeded = 0
+        for _ in range(transfers):
+            sender, receiver = generator.sample(numbers, 2)
+            if repository.transfer(repository.find(sender), repository.find(receiver),
+                                   float(generator.randint(1, 1000))):
+                succeeded += 1
+        done.append(succeeded)
+
+    workers = [threading.Thread(target=transfer_many, args=(seed * 1000 + position,))
+               for position in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return sum(done)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stress concurrent mibank transfers.")
+    parser.add_argument("--accounts", type=int, default=1000)
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--transfers", type=int, default=500, help="per thread")
+    arguments = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        name_of_file = os.path.join(folder, "store.json")
+        before = sum(user["account_balance"] for user in write_store(name_of_file, arguments.accounts))
+
+        start = time.perf_counter()
+        with multiprocessing.Pool(arguments.processes) as pool:
+            succeeded = sum(pool.starmap(
+                worker_threads,
+                [(name_of_file, arguments.threads, arguments.transfers, seed)
+                 for seed in range(arguments.processes)]))
+        elapsed = time.perf_counter() - start
+
+        after = sum(user["account_balance"] for user in AccountRepository(name_of_file=name_of_file).accounts)
+
+    attempted = arguments.processes * arguments.threads * arguments.transfers
+    print(f"{arguments.processes} processes x {arguments.threads} threads: {attempted} transfers "
+          f"({succeeded} succeeded) in {elapsed:.2f}s, {attempted / elapsed:,.0f} transfers/s")
+    print(f"total money before {before:,.2f}, after {after:,.2f}: "
+          f"{'conserved' if before == after else 'NOT CONSERVED'}")
+    if before != after:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
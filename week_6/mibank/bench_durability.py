@@ -0,0 +1,81 @@
+import argparse
+import collections
+import os
+import random
+import tempfile
+import threading
+import time
+
+from commit_manager import POLICIES
+from repository import AccountRepository
+from synthetic import write_store
+
+
+def watch_unsynced(commits, stop, ages):
+    # Samples how long records sit written but not yet on disk. For "async"
+    # those records are already acknowledged, so this is what a crash loses.
+    # For "durable" and "group" nobody has been told they succeeded yet.
+    waiting = collections.deque()
+    oldest = 0.0
+    while not stop.is_set():
+        now = time.perf_counter()
+        written, synced = commits.written, commits.synced
+        if not waiting or waiting[-1][0] < written:
+            waiting.append((written, now))
+        while waiting and waiting[0][0] <= synced:
+            waiting.popleft()
+        if waiting:
+            oldest = max(oldest, now - waiting[0][1])
+        time.sleep(0.0002)
+    ages.append(oldest)
+
+
+def run(name_of_file, policy, threads, operations):
+    repository = AccountRepository(name_of_file=name_of_file, durability=policy,
+                                   compact_every=threads * operations + 1)
+    numbers = list(repository.index)
+
+    def deposit_many(seed):
+        generator = random.Random(seed)
+        for _ in range(operations):
+            repository.deposit(repository.find(generator.choice(numbers)), 1.0)
+
+    stop, ages = threading.Event(), []
+    watcher = threading.Thread(target=watch_unsynced, args=(repository.commits, stop, ages))
+    watcher.start()
+
+    workers = [threading.Thread(target=deposit_many, args=(seed,)) for seed in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+
+    stop.set()
+    watcher.join()
+    repository.commits.sync_now()
+    return threads * operations / elapsed, ages[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare mibank durability policies.")
+    parser.add_argument("--accounts", type=int, default=10_000)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 8])
+    parser.add_argument("--operations", type=int, default=500, help="per thread")
+    arguments = parser.parse_args()
+
+    print(f"{'policy':>8} {'threads':>8} {'ops/s':>10} {'max unsynced (ms)':>18} {'lost on crash':>14}")
+    with tempfile.TemporaryDirectory() as folder:
+        for policy in POLICIES:
+            for threads in arguments.threads:
+                name_of_file = os.path.join(folder, f"store_{policy}_{threads}.json")
+                write_store(name_of_file, arguments.accounts)
+                per_second, unsynced = run(name_of_file, policy, threads, arguments.operations)
+                # Only "async" acknowledges records before they are on disk.
+                lost = f"{unsynced * 1000:.1f}ms" if policy == "async" else "nothing"
+                print(f"{policy:>8} {threads:>8} {per_second:>10,.0f} {unsynced * 1000:>18.1f} {lost:>14}")
+
+
+if __name__ == "__main__":
+    main()
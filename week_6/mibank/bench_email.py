@@ -0,0 +1,47 @@
+import os
+import sys
+import tempfile
+import time
+
+from repository import AccountRepository
+from synthetic import write_store
+
+REGISTRATIONS = 1_000_000
+BLOCK = 100_000
+
+
+def main(count):
+    with tempfile.TemporaryDirectory() as folder:
+        name_of_file = os.path.join(folder, "store.json")
+        write_store(name_of_file, 0)
+        repository = AccountRepository(name_of_file=name_of_file, autosave=False)
+        numbers = repository.allocator.allocate_many(count)
+
+        # One add() per account, the way Register and batch mode call it. The
+        # duplicate check is a dict lookup, so each block should cost the same.
+        with repository.commit_lock:
+            for start_at in range(0, count, BLOCK):
+                start = time.perf_counter()
+                for position in range(start_at, min(start_at + BLOCK, count)):
+                    repository.add({"name": f"user{position}", "email": f"User{position}@Mibank.test",
+                                    "account_number": numbers[position], "account_balance": 0})
+                elapsed = time.perf_counter() - start
+                print(f"accounts {start_at:>9}-{start_at + BLOCK:<9} {elapsed / BLOCK * 1_000_000:.2f}us per insert")
+
+            start = time.perf_counter()
+            rejected = sum(not repository.add({"name": "again", "email": f" user{position}@mibank.test ",
+                                               "account_number": 0, "account_balance": 0})
+                           for position in range(0, count, count // 1000 or 1))
+            duplicate_us = (time.perf_counter() - start) / rejected * 1_000_000
+
+        start = time.perf_counter()
+        for position in range(0, count, 10):
+            repository.find_by_email(f"user{position}@mibank.test")
+        lookup_us = (time.perf_counter() - start) / len(range(0, count, 10)) * 1_000_000
+
+    print(f"{rejected} duplicates rejected at {duplicate_us:.2f}us each, "
+          f"find_by_email: {lookup_us:.2f}us each")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else REGISTRATIONS)
@@ -0,0 +1,55 @@
+import os
+import sys
+import tempfile
+import time
+
+from repository import AccountRepository
+from synthetic import write_store
+
+SIZES = [10_000, 100_000, 300_000]
+REWRITES = 20
+
+
+def per_operation_ms(repository, accounts):
+    start = time.perf_counter()
+    for user in accounts:
+        repository.deposit(repository.find(user["account_number"]), 1.0)
+    return (time.perf_counter() - start) / len(accounts) * 1000
+
+
+def journaled_ms(repository, accounts, compactions):
+    # Deposits until the journal has been compacted `compactions` times, so the
+    # average pays for compaction as well as the appends. Returns the mean and
+    # the slowest single operation.
+    slowest, operations, seen = 0.0, 0, 0
+    start = time.perf_counter()
+    while seen < compactions:
+        user = accounts[operations % len(accounts)]
+        before = repository.journal.records
+        began = time.perf_counter()
+        repository.deposit(repository.find(user["account_number"]), 1.0)
+        slowest = max(slowest, time.perf_counter() - began)
+        operations += 1
+        if repository.journal.records < before:
+            seen += 1
+    return (time.perf_counter() - start) / operations * 1000, slowest * 1000, operations
+
+
+def main(sizes, compactions=2):
+    print(f"{'accounts':>10} {'operations':>11} {'journaled (ms/op)':>18} {'slowest (ms)':>13} "
+          f"{'full rewrite (ms/op)':>21}")
+    with tempfile.TemporaryDirectory() as folder:
+        for size in sizes:
+            name_of_file = os.path.join(folder, f"store_{size}.json")
+            accounts = write_store(name_of_file, size)
+
+            journaled, slowest, operations = journaled_ms(
+                AccountRepository(name_of_file, journaled=True, checkpoints=False), accounts, compactions)
+            rewritten = per_operation_ms(
+                AccountRepository(name_of_file, journaled=False, checkpoints=False), accounts[:REWRITES])
+
+            print(f"{size:>10} {operations:>11} {journaled:>18.4f} {slowest:>13.1f} {rewritten:>21.2f}")
+
+
+if __name__ == "__main__":
+    main([int(size) for size in sys.argv[1:]] or SIZES)
@@ -0,0 +1,47 @@
+import os
+import random
+import sys
+import tempfile
+import time
+
+from repository import AccountRepository
+from synthetic import write_store
+
+SIZES = [10_000, 100_000, 1_000_000]
+LOOKUPS = 10_000
+SCAN_LOOKUPS = 20
+
+
+def linear_find(accounts, account_no):
+    for user in accounts:
+        if int(account_no) == user['account_number']:
+            return user
+
+
+def per_lookup_us(find, numbers):
+    start = time.perf_counter()
+    for account_no in numbers:
+        find(account_no)
+    return (time.perf_counter() - start) / len(numbers) * 1_000_000
+
+
+def main(sizes):
+    print(f"{'accounts':>10} {'index (us)':>12} {'linear scan (us)':>18}")
+    with tempfile.TemporaryDirectory() as folder:
+        for size in sizes:
+            name_of_file = os.path.join(folder, f"store_{size}.json")
+            accounts = write_store(name_of_file, size)
+            repository = AccountRepository(name_of_file=name_of_file)
+
+            numbers = [str(user["account_number"])
+                       for user in random.choices(accounts, k=LOOKUPS)]
+            indexed = per_lookup_us(repository.find, numbers)
+            scanned = per_lookup_us(
+                lambda account_no: linear_find(repository.accounts, account_no),
+                numbers[:SCAN_LOOKUPS])
+
+            print(f"{size:>10} {indexed:>12.3f} {scanned:>18.1f}")
+
+
+if __name__ == "__main__":
+    main([int(size) for size in sys.argv[1:]] or SIZES)
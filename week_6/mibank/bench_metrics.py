@@ -0,0 +1,54 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+OPERATIONS = 200_000
+
+
+def measure(enabled, name_of_file, operations):
+    # Runs in its own process: metrics are switched on or off at import time.
+    import config
+    config.METRICS = enabled
+    import metrics
+    from repository import AccountRepository
+
+    repository = AccountRepository(name_of_file=name_of_file, autosave=False)
+    numbers = list(repository.index)
+    start = time.perf_counter()
+    with repository.commit_lock:
+        for position in range(operations):
+            user = repository.find(numbers[position % len(numbers)])
+            repository.deposit(user, 1.0)
+            repository.withdraw(user, 1.0)
+    elapsed = time.perf_counter() - start
+    print(json.dumps({"us_per_op": elapsed / (2 * operations) * 1_000_000,
+                      "report": metrics.report() if enabled else ""}))
+
+
+def main(operations):
+    from synthetic import write_store
+
+    with tempfile.TemporaryDirectory() as folder:
+        name_of_file = os.path.join(folder, "store.json")
+        write_store(name_of_file, 100_000)
+
+        runs = {}
+        for enabled in (False, True):
+            output = subprocess.run([sys.executable, __file__, "--measure", str(enabled), name_of_file,
+                                     str(operations)], capture_output=True, text=True, check=True).stdout
+            runs[enabled] = json.loads(output)
+
+    off, on = runs[False]["us_per_op"], runs[True]["us_per_op"]
+    print(f"in-memory deposit/withdraw: {off:.2f}us per op without metrics, {on:.2f}us with "
+          f"(+{on - off:.2f}us, {(on - off) / off:.0%})")
+    print(runs[True]["report"])
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 5 and sys.argv[1] == "--measure":
+        measure(sys.argv[2] == "True", sys.argv[3], int(sys.argv[4]))
+    else:
+        main(int(sys.argv[1]) if len(sys.argv) > 1 else OPERATIONS)
@@ -0,0 +1,93 @@
+import argparse
+import os
+import random
+import tempfile
+import time
+
+import numpy as np
+
+from repository import AccountRepository
+from settlement import Settlement, settle
+from synthetic import write_store
+
+
+def settle_sequentially(balances, senders, receivers, amounts):
+    # What Transfer.run does, one transfer at a time, without the storage.
+    balances = balances.tolist()
+    accepted = []
+    for sender, receiver, amount in zip(senders.tolist(), receivers.tolist(), amounts.tolist()):
+        if balances[sender] < amount:
+            accepted.append(False)
+            continue
+        if sender != receiver:
+            balances[sender] -= amount
+            balances[receiver] += amount
+        accepted.append(True)
+    return np.array(balances), np.array(accepted)
+
+
+def make_transfers(accounts, count, largest, seed):
+    generator = np.random.default_rng(seed)
+    senders = generator.integers(0, accounts, count)
+    receivers = generator.integers(0, accounts, count)
+    amounts = generator.integers(1, largest, count).astype(np.float64) + 0.25
+    return senders, receivers, amounts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the settlement engine with one-by-one transfers.")
+    parser.add_argument("--accounts", type=int, default=100_000)
+    parser.add_argument("--transfers", type=int, default=1_000_000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    arguments = parser.parse_args()
+
+    generator = random.Random(2025)
+    balances = np.array([float(generator.randint(0, 100_000)) for _ in range(arguments.accounts)])
+
+    print(f"{arguments.accounts} accounts, {arguments.transfers} transfers, {arguments.workers} workers")
+    print(f"{'payments':>9} {'rejected':>9} {'sequential (s)':>15} {'engine (s)':>11} {'identical':>10}")
+    for label, largest in [("small", 100), ("large", 50_000)]:
+        senders, receivers, amounts = make_transfers(arguments.accounts, arguments.transfers, largest, seed=7)
+
+        start = time.perf_counter()
+        expected_balances, expected_accepted = settle_sequentially(balances, senders, receivers, amounts)
+        sequential = time.perf_counter() - start
+
+        start = time.perf_counter()
+        got_balances, got_accepted = settle(balances, senders, receivers, amounts, arguments.workers)
+        engine = time.perf_counter() - start
+
+        identical = (np.array_equal(expected_balances, got_balances)
+                     and np.array_equal(expected_accepted, got_accepted))
+        rejected = np.count_nonzero(~got_accepted)
+        print(f"{label:>9} {rejected:>9} {sequential:>15.2f} {engine:>11.2f} {str(identical):>10}")
+        if not identical:
+            raise SystemExit(1)
+
+    # Against the store: Transfer.run's path per transfer, then one settlement.
+    with tempfile.TemporaryDirectory() as folder:
+        name_of_file = os.path.join(folder, "store.json")
+        accounts = write_store(name_of_file, 10_000)
+        numbers = [user["account_number"] for user in accounts]
+        transfers = [{"sender": generator.choice(numbers), "receiver": generator.choice(numbers),
+                      "amount": float(generator.randint(1, 100))} for _ in range(2_000)]
+
+        repository = AccountRepository(name_of_file=name_of_file)
+        start = time.perf_counter()
+        for transfer in transfers:
+            repository.transfer(repository.find(transfer["sender"]), repository.find(transfer["receiver"]),
+                                transfer["amount"])
+        one_by_one = (time.perf_counter() - start) / len(transfers) * 1_000_000
+
+        write_store(name_of_file, 10_000)
+        os.remove(name_of_file + ".log")
+        repository = AccountRepository(name_of_file=name_of_file)
+        start = time.perf_counter()
+        Settlement(repository, arguments.workers).run(transfers)
+        settled = (time.perf_counter() - start) / len(transfers) * 1_000_000
+
+    print(f"store: repository.transfer {one_by_one:.1f}us per transfer, Settlement.run {settled:.1f}us per transfer")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from synthetic import write_store
+
+SIZES = [0, 100_000, 1_000_000]
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def wait_for(process, text):
+    # Read the unbuffered output until `text` shows up. Prompts end without a
+    # newline, so read whatever is there rather than whole lines.
+    seen = b""
+    while text not in seen:
+        chunk = os.read(process.stdout.fileno(), 65536)
+        if not chunk:
+            raise RuntimeError(f"main.py exited before printing {text!r}")
+        seen += chunk
+
+
+def measure(folder, account_no):
+    environment = dict(os.environ, PYTHONPATH=HERE)
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable, "-u", os.path.join(HERE, "main.py")], cwd=folder,
+                               env=environment, stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+    try:
+        wait_for(process, b"Choose(")
+        prompt = time.perf_counter() - start
+
+        # The first option that needs the store pays for loading it.
+        first_balance = None
+        if account_no is not None:
+            process.stdin.write(f"4\n{account_no}\n".encode())
+            process.stdin.flush()
+            wait_for(process, b"balance is")
+            first_balance = time.perf_counter() - start
+
+        process.stdin.write(b"7\n")
+        process.stdin.flush()
+        process.wait()
+    finally:
+        process.kill()
+    return prompt, first_balance
+
+
+def main(sizes):
+    print(f"{'accounts':>10} {'first prompt (ms)':>18} {'first balance (ms)':>19}")
+    for count in sizes:
+        with tempfile.TemporaryDirectory() as folder:
+            accounts = write_store(os.path.join(folder, "store.json"), count)
+            prompt, first_balance = measure(folder, accounts[0]["account_number"] if accounts else None)
+            balance = "-" if first_balance is None else f"{first_balance * 1000:.1f}"
+            print(f"{count:>10} {prompt * 1000:>18.1f} {balance:>19}")
+
+
+if __name__ == "__main__":
+    main([int(size) for size in sys.argv[1:]] or SIZES)
@@ -0,0 +1,63 @@
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from model import Model
+from synthetic import write_store
+
+SIZES = [100_000, 1_000_000]
+
+
+def measure(mode, name_of_file):
+    # Runs in a fresh process so peak RSS belongs to this loader alone.
+    start = time.perf_counter()
+    first = None
+    count = 0
+
+    if mode == "load":
+        for user in Model.load_a_file(name_of_file=name_of_file):
+            if first is None:
+                first = time.perf_counter() - start
+            count += 1
+    else:
+        for user in Model.stream_a_file(name_of_file=name_of_file):
+            if first is None:
+                first = time.perf_counter() - start
+            count += 1
+
+    total = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(json.dumps({"count": count, "first_ms": first * 1000, "total_s": total,
+                      "peak_mb": peak / 1024}))
+
+
+def main(sizes):
+    print(f"{'accounts':>10} {'file MB':>8} {'loader':>7} {'first record (ms)':>18} "
+          f"{'all records (s)':>16} {'peak RSS (MB)':>14}")
+    with tempfile.TemporaryDirectory() as folder:
+        for size in sizes:
+            name_of_file = os.path.join(folder, f"store_{size}.json")
+            # Children inherit the parent's peak RSS across fork, so the parent
+            # never holds the generated accounts itself.
+            subprocess.run([sys.executable, __file__, "--write", str(size), name_of_file], check=True)
+            megabytes = os.path.getsize(name_of_file) / 1e6
+
+            for mode in ("load", "stream"):
+                output = subprocess.run([sys.executable, __file__, "--measure", mode, name_of_file],
+                                        capture_output=True, text=True, check=True).stdout
+                result = json.loads(output)
+                print(f"{size:>10} {megabytes:>8.1f} {mode:>7} {result['first_ms']:>18.2f} "
+                      f"{result['total_s']:>16.2f} {result['peak_mb']:>14.1f}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 4 and sys.argv[1] == "--measure":
+        measure(sys.argv[2], sys.argv[3])
+    elif len(sys.argv) == 4 and sys.argv[1] == "--write":
+        write_store(sys.argv[3], int(sys.argv[2]))
+    else:
+        main([int(size) for size in sys.argv[1:]] or SIZES)
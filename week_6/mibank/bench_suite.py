@@ -0,0 +1,170 @@
+import argparse
+import builtins
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from deposit import Deposit
+from model import Model
+from register import Register
+from repository import AccountRepository
+from synthetic import write_store
+from transfer import Transfer
+from view_balance import ViewBalance
+from withdraw import Withdraw
+
+SIZES = [1_000, 10_000, 100_000, 1_000_000]
+REPEATS = 2_000
+
+
+def written_bytes():
+    # Bytes this process has passed to write(); Linux only.
+    try:
+        with open("/proc/self/io") as io_stats:
+            for line in io_stats:
+                if line.startswith("wchar:"):
+                    return int(line.split()[1])
+    except OSError:
+        return None
+
+
+@contextlib.contextmanager
+def scripted(answers):
+    # Feed the handler's input() prompts from a list and swallow what it prints.
+    answers = iter(answers)
+    real_input = builtins.input
+    builtins.input = lambda prompt="": next(answers)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            yield
+    finally:
+        builtins.input = real_input
+
+
+def percentile(values, fraction):
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def measure(run, scripts):
+    timings = []
+    before = written_bytes()
+    for answers in scripts:
+        with scripted(answers):
+            start = time.perf_counter()
+            run()
+            timings.append(time.perf_counter() - start)
+    after = written_bytes()
+
+    total = sum(timings)
+    timings.sort()
+    return {"count": len(timings),
+            "p50_us": percentile(timings, 0.50) * 1e6,
+            "p95_us": percentile(timings, 0.95) * 1e6,
+            "p99_us": percentile(timings, 0.99) * 1e6,
+            "ops_per_second": len(timings) / total if total else None,
+            "bytes_written_per_op": None if before is None else (after - before) / len(timings)}
+
+
+def run_size(name_of_file, size, repeats):
+    numbers = [user["account_number"] for user in Model.stream_a_file(name_of_file=name_of_file)]
+    generator = random.Random(size)
+    results = {}
+
+    start = time.perf_counter()
+    repository = AccountRepository(name_of_file=name_of_file)
+    results["model_load"] = {"count": 1, "seconds": time.perf_counter() - start}
+
+    start = time.perf_counter()
+    repository.save()
+    results["model_save"] = {"count": 1, "seconds": time.perf_counter() - start}
+
+    def pick():
+        return str(generator.choice(numbers))
+
+    results["register"] = measure(Register(repository).run,
+                                  [[f"bench{position}", f"bench{position}@mibank.test"]
+                                   for position in range(repeats)])
+    results["deposit"] = measure(Deposit(repository).run, [[pick(), "100"] for _ in range(repeats)])
+    results["withdraw"] = measure(Withdraw(repository).run, [[pick(), "10"] for _ in range(repeats)])
+    results["view_balance"] = measure(ViewBalance(repository).run, [[pick()] for _ in range(repeats)])
+    results["transfer"] = measure(Transfer(repository).run, [[pick(), pick(), "5"] for _ in range(repeats)])
+
+    results["peak_rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(old, new):
+    print(f"{'size':>9} {'operation':>13} {'old p50 (us)':>13} {'new p50 (us)':>13} {'change':>8}")
+    for size, operations in new["sizes"].items():
+        for name, result in operations.items():
+            previous = old["sizes"].get(size, {}).get(name)
+            if not isinstance(result, dict) or "p50_us" not in result or not previous:
+                continue
+            change = result["p50_us"] / previous["p50_us"] - 1
+            print(f"{size:>9} {name:>13} {previous['p50_us']:>13.2f} {result['p50_us']:>13.2f} {change:>+8.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark every mibank operation at several store sizes.")
+    parser.add_argument("sizes", nargs="*", type=int, default=SIZES)
+    parser.add_argument("--repeats", type=int, default=REPEATS)
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--compare", help="earlier --output file to compare against")
+    parser.add_argument("--measure", nargs=2, help=argparse.SUPPRESS)
+    parser.add_argument("--write", nargs=2, help=argparse.SUPPRESS)
+    arguments = parser.parse_args()
+
+    # Each size is generated and measured in its own process, so peak RSS is
+    # that size's alone.
+    if arguments.write:
+        write_store(arguments.write[1], int(arguments.write[0]))
+        return
+    if arguments.measure:
+        print(json.dumps(run_size(arguments.measure[1], int(arguments.measure[0]), arguments.repeats)))
+        return
+
+    report = {"commit": git_commit(), "python": platform.python_version(),
+              "machine": platform.machine(), "timestamp": time.time(),
+              "repeats": arguments.repeats, "sizes": {}}
+    with tempfile.TemporaryDirectory() as folder:
+        for size in arguments.sizes:
+            name_of_file = os.path.join(folder, f"store_{size}.json")
+            subprocess.run([sys.executable, __file__, "--write", str(size), name_of_file], check=True)
+            output = subprocess.run([sys.executable, __file__, "--measure", str(size), name_of_file,
+                                     "--repeats", str(arguments.repeats)],
+                                    capture_output=True, text=True, check=True).stdout
+            report["sizes"][str(size)] = json.loads(output)
+
+            for name, result in report["sizes"][str(size)].items():
+                if isinstance(result, dict) and "p50_us" in result:
+                    print(f"{size:>9} {name:>13}: p50 {result['p50_us']:9.2f}us  p99 {result['p99_us']:9.2f}us  "
+                          f"{result['ops_per_second']:>12,.0f} ops/s  {result['bytes_written_per_op']:>9.1f} B/op")
+            print(f"{size:>9} {'peak RSS':>13}: {report['sizes'][str(size)]['peak_rss_mb']:.1f} MB")
+
+    with open(arguments.output, "w") as output:
+        output.write(json.dumps(report, indent=2))
+    print(f"Wrote {arguments.output}")
+
+    if arguments.compare:
+        with open(arguments.compare) as previous:
+            compare(json.loads(previous.read()), report)
+
+
+if __name__ == "__main__":
+    main()
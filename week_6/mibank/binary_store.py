@@ -0,0 +1,239 @@
+import mmap
+import os
+import struct
+import sys
+from contextlib import contextmanager
+
+import config
+from allocator import AccountNumberAllocator
+from locking import FileLock
+from metrics import timed
+from model import Model
+
+# File layout, all little-endian:
+#   header   magic, version, account count, offset of the string table
+#   numbers  one u64 per account, sorted, so a lookup is a binary search
+#   records  one fixed-size record per account, in the same order as numbers
+#   strings  utf-8 names and emails that records point into
+HEADER = struct.Struct("<4sHxxQQ")
+NUMBER = struct.Struct("<Q")
+# balance comes first, so an update rewrites the first 8 bytes of a record.
+RECORD = struct.Struct("<dQIQI")
+BALANCE = struct.Struct("<d")
+
+MAGIC = b"MIBK"
+VERSION = 1
+
+
+def write_binary(name_of_file, accounts):
+    accounts = sorted(accounts, key=lambda user: user["account_number"])
+
+    numbers = bytearray()
+    records = bytearray()
+    strings = bytearray()
+    for user in accounts:
+        name = user["name"].encode()
+        email = user["email"].encode()
+
+        numbers += NUMBER.pack(user["account_number"])
+        records += RECORD.pack(float(user["account_balance"]),
+                               len(strings), len(name), len(strings) + len(name), len(email))
+        strings += name + email
+
+    strings_offset = HEADER.size + len(numbers) + len(records)
+
+    temporary = name_of_file + ".tmp"
+    with open(temporary, "wb") as store:
+        store.write(HEADER.pack(MAGIC, VERSION, len(accounts), strings_offset))
+        store.write(numbers)
+        store.write(records)
+        store.write(strings)
+    os.replace(temporary, name_of_file)
+
+
+def read_binary(name_of_file):
+    store = BinaryStore(name_of_file)
+    accounts = [store.user(position) for position in range(store.count)]
+    store.close()
+    return accounts
+
+
+class BinaryStore:
+    def __init__(self, name_of_file=config.BINARY_FILE):
+        self.name_of_file = name_of_file
+        # Held around every read-modify-write of a balance and around rewrites
+        # of the file, by every process using this store.
+        self.commit_lock = FileLock(name_of_file + ".lock")
+        self.open()
+
+        self.allocator = AccountNumberAllocator(name_of_file + ".counter", self.commit_lock,
+                                                lambda account_no: self.position(account_no) is not None)
+
+    def open(self):
+        with open(self.name_of_file, "r+b") as store:
+            self.map = mmap.mmap(store.fileno(), 0)
+
+        magic, version, self.count, self.strings_offset = HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{self.name_of_file} is not a mibank binary store")
+
+        self.numbers_offset = HEADER.size
+        self.records_offset = self.numbers_offset + self.count * NUMBER.size
+        self.emails = None
+        self.seen = self.signature()
+
+    def close(self):
+        self.map.close()
+
+    def signature(self):
+        stat = os.stat(self.name_of_file)
+        return stat.st_ino, stat.st_size
+
+    @timed("binary.refresh")
+    def refresh(self):
+        # Balance updates happen in the shared mapping, so other processes see
+        # them already. Only a rewritten file (a new account) needs a remap.
+        if self.signature() != self.seen:
+            self.close()
+            self.open()
+
+    @contextmanager
+    def locked(self, *account_numbers):
+        # Serialized per store, as in AccountRepository.
+        with self.commit_lock:
+            # Another process may have rewritten the file; write into the new one.
+            self.refresh()
+            yield
+
+    def position(self, account_number):
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            number = NUMBER.unpack_from(self.map, self.numbers_offset + middle * NUMBER.size)[0]
+            if number < account_number:
+                low = middle + 1
+            elif number > account_number:
+                high = middle
+            else:
+                return middle
+        return None
+
+    def user(self, position):
+        account_number = NUMBER.unpack_from(self.map, self.numbers_offset + position * NUMBER.size)[0]
+        balance, name_at, name_length, email_at, email_length = RECORD.unpack_from(
+            self.map, self.records_offset + position * RECORD.size)
+        strings = self.strings_offset
+
+        return {"name": self.map[strings + name_at:strings + name_at + name_length].decode(),
+                "email": self.map[strings + email_at:strings + email_at + email_length].decode(),
+                "account_number": account_number,
+                "account_balance": balance}
+
+    def balance(self, account_number):
+        position = self.position(int(account_number))
+        if position is None:
+            return None
+        return BALANCE.unpack_from(self.map, self.records_offset + position * RECORD.size)[0]
+
+    def set_balance(self, user, account_balance):
+        position = self.position(user["account_number"])
+        BALANCE.pack_into(self.map, self.records_offset + position * RECORD.size, account_balance)
+        user["account_balance"] = account_balance
+
+    def find(self, account_number):
+        position = self.position(int(account_number))
+        return None if position is None else self.user(position)
+
+    def email_index(self):
+        # Built on first use, so opening the file stays cheap for balance checks.
+        if self.emails is None:
+            self.emails = {}
+            for position in range(self.count):
+                self.emails.setdefault(self.user(position)["email"].strip().lower(), position)
+        return self.emails
+
+    def find_by_email(self, email):
+        position = self.email_index().get(email.strip().lower())
+        return None if position is None else self.user(position)
+
+    def add(self, user):
+        return not self.add_many([user])
+
+    @timed("binary.add_many")
+    def add_many(self, users):
+        with self.commit_lock:
+            self.refresh()
+            emails = set(self.email_index())
+            accepted, rejected, numbers = [], [], set()
+            for user in users:
+                email = user["email"].strip().lower()
+                account_no = user["account_number"]
+                if email in emails or account_no in numbers or self.position(account_no) is not None:
+                    rejected.append(user)
+                else:
+                    emails.add(email)
+                    numbers.add(account_no)
+                    accepted.append(user)
+
+            # New account numbers land in the middle of the sorted column, so the
+            # file is rewritten. Registration is rare next to balance traffic.
+            # Other processes remap the new file before their next write.
+            accounts = [self.user(position) for position in range(self.count)]
+            accounts.extend(accepted)
+            self.close()
+            write_binary(self.name_of_file, accounts)
+            self.open()
+        return rejected
+
+    def deposit(self, user, amount):
+        with self.locked(user["account_number"]):
+            self.set_balance(user, self.balance(user["account_number"]) + amount)
+
+    def withdraw(self, user, amount):
+        with self.locked(user["account_number"]):
+            balance = self.balance(user["account_number"])
+            if balance < amount:
+                user["account_balance"] = balance
+                return False
+
+            self.set_balance(user, balance - amount)
+            return True
+
+    def transfer(self, sender, receiver, amount):
+        with self.locked(sender["account_number"], receiver["account_number"]):
+            balance = self.balance(sender["account_number"])
+            if balance < amount:
+                sender["account_balance"] = balance
+                return False
+
+            self.set_balance(sender, balance - amount)
+            self.set_balance(receiver, self.balance(receiver["account_number"]) + amount)
+            return True
+
+    @timed("binary.flush")
+    def flush(self):
+        self.map.flush()
+
+
+if __name__ == "__main__":
+    usage = "usage: python binary_store.py to-binary|to-json <source> <target>"
+    if len(sys.argv) != 4:
+        sys.exit(usage)
+
+    command, source, target = sys.argv[1:]
+    match command:
+        case "to-binary":
+            # Through AccountRepository, so the journal and checkpoint come along.
+            from repository import AccountRepository
+            write_binary(target, AccountRepository(name_of_file=source).accounts)
+        case "to-json":
+            # A journal or checkpoint left beside the target would replay its
+            # old balances over the converted ones on the next load.
+            leftovers = [target + suffix for suffix in (".log", ".checkpoint", ".log.checkpointing")
+                         if os.path.exists(target + suffix)]
+            if leftovers:
+                sys.exit(f"{target} still has {', '.join(leftovers)}; move those away or pick another target")
+            Model.save_a_file(name_of_file=target, content=read_binary(source), codec="json")
+        case _:
+            sys.exit(usage)
+    print(f"Converted {source} to {target}")
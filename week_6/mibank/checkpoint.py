@@ -0,0 +1,68 @@
+import marshal
+import os
+import threading
+
+from metrics import timed
+
+MAGIC = b"MIBC1\n"
+
+
+def columns_of(accounts):
+    # Copy out of the live dicts, so the snapshot is fixed at this moment.
+    return ([user["account_number"] for user in accounts],
+            [user["account_balance"] for user in accounts],
+            [user["name"] for user in accounts],
+            [user["email"] for user in accounts])
+
+
+@timed("checkpoint.write")
+def write_checkpoint(name_of_file, columns):
+    temporary = name_of_file + ".tmp"
+    with open(temporary, "wb") as store:
+        store.write(MAGIC)
+        marshal.dump(columns, store)
+        store.flush()
+        os.fsync(store.fileno())
+    os.replace(temporary, name_of_file)
+
+
+@timed("checkpoint.read")
+def read_checkpoint(name_of_file):
+    with open(name_of_file, "rb") as store:
+        if store.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{name_of_file} is not a mibank checkpoint")
+        # loads() on the whole file; load() on a file object reads it piece by piece.
+        return accounts_of(marshal.loads(store.read()))
+
+
+def accounts_of(columns):
+    numbers, balances, names, emails = columns
+    return [{"name": name, "email": email, "account_number": account_no, "account_balance": balance}
+            for account_no, balance, name, email in zip(numbers, balances, names, emails)]
+
+
+# Background thread that checkpoints a repository every `interval` seconds
+# while there is journal to fold in. Run one per store, in the process that
+# owns it.
+class Checkpointer:
+    def __init__(self, repository, interval):
+        self.repository = repository
+        self.interval = interval
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, name="mibank-checkpointer", daemon=True)
+
+    def start(self):
+        # While this runs, the repository leaves checkpoints to it.
+        self.repository.checkpointer = self
+        self.thread.start()
+        return self
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            if self.repository.journal.records or os.path.exists(self.repository.rotated.name_of_file):
+                self.repository.checkpoint()
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+        self.repository.checkpointer = None
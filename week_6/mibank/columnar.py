@@ -0,0 +1,114 @@
+import sys
+
+import numpy as np
+
+from storage import open_repository
+
+
+# Account numbers and balances as NumPy columns, kept in step with a
+# repository through watch(). Row order is arrival order, not sorted.
+class BalanceTable:
+    def __init__(self, repository=None):
+        self.rows = {}
+        self.size = 0
+        self.numbers = np.zeros(1024, dtype=np.int64)
+        self.balances = np.zeros(1024, dtype=np.float64)
+
+        if repository is not None:
+            if not hasattr(repository, "watch"):
+                # SQLite and the binary store keep no accounts in memory to follow.
+                raise ValueError(f"{type(repository).__name__} cannot feed a BalanceTable; "
+                                 "use the json or sharded backend")
+            self.update(repository.accounts)
+            repository.watch(self.update)
+
+    def grow(self, needed):
+        capacity = len(self.numbers)
+        while capacity < needed:
+            capacity *= 2
+        if capacity != len(self.numbers):
+            self.numbers = np.resize(self.numbers, capacity)
+            self.balances = np.resize(self.balances, capacity)
+
+    def update(self, users):
+        if len(users) > 1024 and not self.rows:
+            self.load(users)
+            return
+
+        for user in users:
+            row = self.rows.get(user["account_number"])
+            if row is None:
+                row = self.size
+                self.grow(row + 1)
+                self.rows[user["account_number"]] = row
+                self.numbers[row] = user["account_number"]
+                self.size += 1
+            self.balances[row] = user["account_balance"]
+
+    def load(self, users):
+        # First fill from a whole store: build the columns in one pass.
+        count = len(users)
+        self.load_columns(np.fromiter((user["account_number"] for user in users), np.int64, count),
+                          np.fromiter((user["account_balance"] for user in users), np.float64, count))
+
+    def load_columns(self, numbers, balances):
+        count = len(numbers)
+        self.grow(count)
+        self.numbers[:count] = numbers
+        self.balances[:count] = balances
+        self.rows = dict(zip(self.numbers[:count].tolist(), range(count)))
+        self.size = count
+
+    def column(self):
+        return self.balances[:self.size]
+
+    def total(self):
+        return float(self.column().sum())
+
+    def zero_balance_count(self):
+        return int(np.count_nonzero(self.column() == 0))
+
+    def top(self, n=10):
+        balances = self.column()
+        n = min(n, self.size)
+        if n == 0:
+            return []
+        # argpartition finds the n largest in linear time; only they get sorted.
+        rows = np.argpartition(balances, self.size - n)[self.size - n:]
+        rows = rows[np.argsort(balances[rows])[::-1]]
+        return list(zip(self.numbers[rows].tolist(), balances[rows].tolist()))
+
+    def histogram(self, bins=10):
+        # Equal-width bins: work out each row's bin arithmetically and count
+        # with bincount, which beats np.histogram's general path on big columns.
+        balances = self.column()
+        if self.size == 0:
+            return [0] * bins, np.linspace(0, 1, bins + 1).tolist()
+
+        low, high = float(balances.min()), float(balances.max())
+        if low == high:
+            low, high = low - 0.5, high + 0.5
+
+        rows = ((balances - low) * (bins / (high - low))).astype(np.intp)
+        np.minimum(rows, bins - 1, out=rows)
+        counts = np.bincount(rows, minlength=bins)
+        return counts.tolist(), np.linspace(low, high, bins + 1).tolist()
+
+
+if __name__ == "__main__":
+    try:
+        table = BalanceTable(open_repository())
+    except ValueError as error:
+        sys.exit(str(error))
+    top = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+
+    print(f"Accounts: {table.size}")
+    print(f"Total deposits: {table.total():,.2f}")
+    print(f"Zero-balance accounts: {table.zero_balance_count()}")
+    print(f"Top {top} balances:")
+    for account_no, balance in table.top(top):
+        print(f"  {account_no}: {balance:,.2f}")
+    print("Balance histogram:")
+    counts, edges = table.histogram()
+    for count, low, high in zip(counts, edges, edges[1:]):
+        print(f"  {low:>14,.2f} - {high:>14,.2f}: {count}")
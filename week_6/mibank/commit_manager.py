@@ -0,0 +1,147 @@
+import os
+import threading
+import time
+
+import config
+from metrics import count, timer
+
+# "durable": fsync every record before the operation returns.
+# "group":   operations wait for an fsync, but writes arriving within `window`
+#            seconds (or up to `group_size` of them) share one.
+# "async":   operations return at once; a background thread fsyncs every
+#            `window` seconds, so a crash can lose that much.
+POLICIES = ("durable", "group", "async")
+
+
+# Decides when a journal's writes reach the disk. The journal reports each
+# record it has handed to the OS; writers call wait() once they have released
+# the commit lock, so other writers can join the same fsync.
+class CommitManager:
+    def __init__(self, policy=config.DURABILITY, window=config.GROUP_COMMIT_WINDOW,
+                 group_size=config.GROUP_COMMIT_SIZE):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown durability policy: {policy}")
+        self.policy = policy
+        self.window = window
+        self.group_size = group_size
+
+        self.condition = threading.Condition()
+        # Records handed to the OS, and how many of them are known to be on disk.
+        self.written = 0
+        self.synced = 0
+        self.syncing = False
+        # Threads that have written a record and not started waiting for it.
+        # A group leader only holds the fsync back while some are left.
+        self.writers = 0
+        # The journal's open file, while it has one.
+        self.store = None
+        # The last record this thread wrote, waiting for wait().
+        self.local = threading.local()
+        self.thread = None
+
+    def wrote(self, store):
+        # Called by the journal, under the commit lock, after each record.
+        with self.condition:
+            self.written += 1
+            self.store = store
+            if not getattr(self.local, "ticket", 0):
+                self.writers += 1
+            self.local.ticket = self.written
+            if self.policy == "durable":
+                with timer("commit.fsync"):
+                    os.fsync(store.fileno())
+                self.synced = self.written
+            elif self.written - self.synced >= self.group_size:
+                self.condition.notify_all()
+
+        if self.policy == "async" and self.thread is None:
+            self.thread = threading.Thread(target=self.run, name="mibank-commit", daemon=True)
+            self.thread.start()
+
+    def ticket(self):
+        # This thread's last record, for waiting on it from another thread.
+        with self.condition:
+            ticket = getattr(self.local, "ticket", 0)
+            if ticket:
+                self.local.ticket = 0
+                self.writers -= 1
+                self.condition.notify_all()
+            return ticket
+
+    def wait(self, ticket=None):
+        # Blocks until this thread's last record (or `ticket`) is on disk. Only
+        # "group" has anything to wait for: "durable" synced already, "async"
+        # never waits.
+        if ticket is None:
+            ticket = self.ticket()
+        if self.policy != "group":
+            return
+
+        with self.condition:
+            while self.synced < ticket:
+                if self.syncing:
+                    self.condition.wait()
+                    continue
+
+                # Lead this group: give writers still on their way the window to
+                # join, then sync for everybody.
+                self.syncing = True
+                deadline = time.monotonic() + self.window
+                while self.writers and self.written - self.synced < self.group_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self.condition.wait(remaining)
+                self.sync()
+
+    def sync_now(self):
+        # For records that must be on disk before the caller goes on, whatever
+        # the policy: two-phase commit prepares and decisions.
+        self.ticket()
+        with self.condition:
+            while self.syncing:
+                self.condition.wait()
+            self.sync()
+
+    def sync(self):
+        # Called with the condition held. The fsync itself runs without it, on
+        # a duplicate of the file descriptor, so writers can keep appending and
+        # the journal can close its file meanwhile.
+        target = self.written
+        if target == self.synced or self.store is None:
+            self.syncing = False
+            self.condition.notify_all()
+            return
+
+        descriptor = os.dup(self.store.fileno())
+        self.syncing = True
+        self.condition.release()
+        try:
+            with timer("commit.fsync"):
+                os.fsync(descriptor)
+        finally:
+            os.close(descriptor)
+            self.condition.acquire()
+            self.syncing = False
+        count("commit.grouped_records", target - self.synced)
+        self.synced = max(self.synced, target)
+        self.condition.notify_all()
+
+    def closing(self, store):
+        # The journal is closing `store` (clear, reload or checkpoint rotation).
+        # Everything written to it goes to disk first.
+        with self.condition:
+            if self.store is store:
+                if self.synced < self.written:
+                    with timer("commit.fsync"):
+                        os.fsync(store.fileno())
+                    self.synced = self.written
+                    self.condition.notify_all()
+                self.store = None
+
+    def run(self):
+        while True:
+            time.sleep(self.window)
+            with self.condition:
+                if not self.syncing:
+                    self.sync()
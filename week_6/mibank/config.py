@@ -0,0 +1,52 @@
+# Storage settings shared by every mibank handler.
+
+# Append each change to store.json.log instead of rewriting store.json every time.
+JOURNALED = True
+
+# Fold the journal back into the snapshot once it holds at least COMPACT_EVERY
+# records and has grown to COMPACT_RATIO times the snapshot's size. A rewrite
+# costs the snapshot's size, so tying it to the snapshot keeps the average
+# write cost the same for a big store as for a small one.
+COMPACT_EVERY = 1000
+COMPACT_RATIO = 0.5
+
+# Which store the handlers use: "json" (store.json), "sqlite" (SQLITE_FILE),
+# "binary" (BINARY_FILE) or "sharded" (store.shard<N>.json, SHARDS of them).
+BACKEND = "json"
+
+SQLITE_FILE = "store.sqlite3"
+
+BINARY_FILE = "store.bin"
+
+# Used when BACKEND is "sharded" and the store has no shard count recorded yet.
+SHARDS = 4
+
+# Snapshot to a binary checkpoint (store.json.checkpoint) instead of rewriting
+# store.json. Every process opening the store must agree on this. Needs JOURNALED.
+CHECKPOINTS = False
+
+# Seconds between background checkpoints, for the process that owns the store.
+CHECKPOINT_INTERVAL = 30
+
+# When journal records reach the disk: "durable" (fsync each one), "group"
+# (operations share an fsync) or "async" (fsync in the background; a crash can
+# lose the last GROUP_COMMIT_WINDOW seconds).
+DURABILITY = "group"
+
+# Seconds a group waits for more writes before its fsync, and the group size
+# that triggers the fsync straight away.
+GROUP_COMMIT_WINDOW = 0.002
+GROUP_COMMIT_SIZE = 64
+
+# How Model writes store.json and the other snapshots: "json" or "marshal"
+# (binary, much faster). Loading detects either, so this can change at any time.
+CODEC = "json"
+
+# Time every storage call: loads, refreshes, flushes, waits for fsync,
+# compactions (see metrics.py). Operations that only touch memory, such as a
+# deposit inside a batch or a server's balance read, take a few microseconds
+# and are not timed: timing each one cost batch mode about a sixth of its
+# throughput. Cheap enough to leave on; the numbers are written to
+# METRICS_FILE when a program exits.
+METRICS = True
+METRICS_FILE = "mibank_metrics.json"
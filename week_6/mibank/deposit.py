@@ -1,21 +1,18 @@
-from model import Model
-
-
-class Deposit(Model):
-    def __init__(self):
-        self.accounts = self.load_a_file(name_of_file="store.json")
+class Deposit:
+    def __init__(self, repository):
+        self.repository = repository
 
     def run(self):
+        self.repository.refresh()
+
         account_no = input("What is your account number: ")
 
-        for users in self.accounts:
-            if int(account_no) == users['account_number']:
-                amount = input("How much do you want to deposit?: ")
-                users['account_balance'] += float(amount)
-                self.save_a_file(name_of_file="store.json",
-                                 content=self.accounts)
-                print(
-                    f"{"==" * 24}\n{amount} has been added to your account.\n{"==" * 24}")
-                break
-        else:
+        user = self.repository.find(account_no)
+        if user is None:
             print("No such account number was found.")
+            return
+
+        amount = input("How much do you want to deposit?: ")
+        self.repository.deposit(user, float(amount))
+        print(
+            f"{"==" * 24}\n{amount} has been added to your account.\n{"==" * 24}")
@@ -0,0 +1,16 @@
+class FindByEmail:
+    def __init__(self, repository):
+        self.repository = repository
+
+    def run(self):
+        self.repository.refresh()
+
+        email = input("What is your email address: ")
+
+        user = self.repository.find_by_email(email)
+        if user is None:
+            print("No account with this email was found.")
+            return
+
+        print(
+            f"{"==" * 24}\nName: {user['name']}\nAccount number: {user['account_number']}\n{"==" * 24}")
@@ -0,0 +1,68 @@
+import json
+import os
+
+from metrics import count, timer
+
+
+class Journal:
+    def __init__(self, name_of_file, commits=None):
+        self.name_of_file = name_of_file
+        # A CommitManager deciding when appends are fsynced. Without one they
+        # only reach the OS.
+        self.commits = commits
+        self.records = 0
+        # Bytes of the file already applied, so a refresh can replay just the tail.
+        self.offset = 0
+        self.store = None
+
+    def append(self, record):
+        if self.store is None:
+            self.store = open(self.name_of_file, "ab")
+
+        line = json.dumps(record, separators=(",", ":")).encode() + b"\n"
+        with timer("journal.append", len(line)):
+            self.store.write(line)
+            self.store.flush()
+        self.offset = self.store.tell()
+        self.records += 1
+        if self.commits is not None:
+            self.commits.wrote(self.store)
+
+    def replay(self, offset=0, repair=True):
+        if not os.path.exists(self.name_of_file):
+            return
+
+        good = offset
+        with open(self.name_of_file, "rb") as store:
+            store.seek(offset)
+            for line in store:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    break
+                good += len(line)
+                self.records += 1
+                yield record
+        count("journal.replayed_bytes", good - offset)
+        self.offset = good
+
+        # A torn last line from a crash mid-append was never committed. Cut it off
+        # so the next append starts on a fresh line. Only a writer holding the
+        # lock may do this; to anyone else the line may still be arriving.
+        if repair and good != os.path.getsize(self.name_of_file):
+            os.truncate(self.name_of_file, good)
+
+    def clear(self):
+        self.close()
+        open(self.name_of_file, "w").close()
+        self.records = 0
+        self.offset = 0
+
+    def close(self):
+        if self.store is not None:
+            if self.commits is not None:
+                self.commits.closing(self.store)
+            self.store.close()
+            self.store = None
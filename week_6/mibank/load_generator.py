@@ -0,0 +1,93 @@
+import argparse
+import asyncio
+import json
+import random
+import time
+
+
+async def client(host, port, requests, depth, numbers, latencies, seed):
+    generator = random.Random(seed)
+    reader, writer = await asyncio.open_connection(host, port)
+    sent = {}
+    # At most `depth` requests in flight on this connection.
+    in_flight = asyncio.Semaphore(depth)
+
+    async def receive(count):
+        for _ in range(count):
+            response = json.loads(await reader.readline())
+            latencies.append(time.perf_counter() - sent.pop(response["id"]))
+            in_flight.release()
+
+    receiver = asyncio.create_task(receive(requests))
+    for request_id in range(requests):
+        await in_flight.acquire()
+
+        kind = generator.random()
+        amount = generator.randint(1, 100)
+        if kind < 0.5:
+            request = {"op": "balance", "account_number": generator.choice(numbers)}
+        elif kind < 0.7:
+            request = {"op": "deposit", "account_number": generator.choice(numbers), "amount": amount}
+        elif kind < 0.8:
+            request = {"op": "withdraw", "account_number": generator.choice(numbers), "amount": amount}
+        else:
+            request = {"op": "transfer", "sender": generator.choice(numbers),
+                       "receiver": generator.choice(numbers), "amount": amount}
+        request["id"] = request_id
+
+        sent[request_id] = time.perf_counter()
+        writer.write(json.dumps(request).encode() + b"\n")
+        await writer.drain()
+
+    await receiver
+    writer.close()
+    await writer.wait_closed()
+
+
+async def register(host, port, count):
+    reader, writer = await asyncio.open_connection(host, port)
+    for position in range(count):
+        writer.write(json.dumps({"id": position, "op": "register", "name": f"load{position}",
+                                 "email": f"load{position}@mibank.test"}).encode() + b"\n")
+    await writer.drain()
+
+    numbers = [json.loads(await reader.readline())["account_number"] for _ in range(count)]
+    writer.close()
+    await writer.wait_closed()
+    return numbers
+
+
+def percentile(values, fraction):
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+async def run(arguments):
+    numbers = await register(arguments.host, arguments.port, arguments.accounts)
+
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*(client(arguments.host, arguments.port, arguments.requests, arguments.depth,
+                                  numbers, latencies, seed)
+                           for seed in range(arguments.connections)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    print(f"{len(latencies)} requests over {arguments.connections} connections "
+          f"(pipeline depth {arguments.depth}) in {elapsed:.2f}s: {len(latencies) / elapsed:,.0f} requests/s")
+    print(f"latency p50 {percentile(latencies, 0.50) * 1000:.2f}ms, "
+          f"p99 {percentile(latencies, 0.99) * 1000:.2f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Drive a running mibank server and report latency.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--accounts", type=int, default=1000)
+    parser.add_argument("--connections", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=5000, help="per connection")
+    parser.add_argument("--depth", type=int, default=32, help="requests in flight per connection")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+import threading
+
+try:
+    import fcntl
+except ImportError:
+    # No flock on Windows; the lock then only covers threads of one process.
+    fcntl = None
+
+
+# Exclusive lock shared by every thread and process that opens the same file.
+# Re-entrant within a thread, so a batch can hold it for its whole run while
+# each operation still takes it.
+class FileLock:
+    def __init__(self, name_of_file):
+        self.name_of_file = name_of_file
+        self.thread_lock = threading.RLock()
+        self.depth = 0
+        self.owner = None
+        self.store = None
+
+    def __enter__(self):
+        self.thread_lock.acquire()
+        self.depth += 1
+        if self.depth == 1 and fcntl is not None:
+            try:
+                if self.store is None:
+                    self.store = open(self.name_of_file, "a")
+                fcntl.flock(self.store.fileno(), fcntl.LOCK_EX)
+            except BaseException:
+                self.depth -= 1
+                self.thread_lock.release()
+                raise
+        self.owner = threading.get_ident()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.depth -= 1
+        if self.depth == 0:
+            self.owner = None
+            if fcntl is not None:
+                fcntl.flock(self.store.fileno(), fcntl.LOCK_UN)
+        self.thread_lock.release()
+
+    def held(self):
+        return self.owner == threading.get_ident()
@@ -1,8 +1,17 @@
+import config
+import metrics
+from checkpoint import Checkpointer
+from storage import open_repository
 from register import Register
 from deposit import Deposit
 from withdraw import Withdraw
 from view_balance import ViewBalance
 from transfer import Transfer
+from find_by_email import FindByEmail
+
+# Menu option -> handler class. Handlers are built the first time they are picked.
+HANDLERS = {"1": Register, "2": Deposit, "3": Withdraw,
+            "4": ViewBalance, "5": Transfer, "6": FindByEmail}
 
 
 class Main:
@@ -10,36 +19,50 @@ class Main:
         self.name = name
         self.founded = founded
 
+        # Nothing is read from disk until an option needs the store, so the
+        # menu shows just as fast for a big store as for an empty one.
+        self.repository = None
+        self.handlers = {}
+
+    def open(self):
+        # One store shared by every handler, so they all see the same accounts.
+        if self.repository is None:
+            self.repository = open_repository()
+            if config.CHECKPOINTS and config.BACKEND == "json":
+                Checkpointer(self.repository, config.CHECKPOINT_INTERVAL).start()
+            elif config.CHECKPOINTS and config.BACKEND == "sharded":
+                for shard in self.repository.shards:
+                    Checkpointer(shard, config.CHECKPOINT_INTERVAL).start()
+        return self.repository
+
+    def handler(self, option):
         # Composition
-        self.register = Register()
-        self.deposit = Deposit()
-        self.withdraw = Withdraw()
-        self.view_balance = ViewBalance()
-        self.transfer = Transfer()
+        if option not in self.handlers:
+            self.handlers[option] = HANDLERS[option](self.open())
+        return self.handlers[option]
 
     def run(self):
         print(
             f"{"~~" * 24}\nWelcome to {self.name}. What do you want to do today?\n{"~~" * 24}")
         while True:
             options = input(
-                "1. Create an account.\n2. Deposit money\n3. Withdraw money. \n4. View balance.\n5. Transfer.\n6. Exit.\nChoose(1|2|3|4|5|6):")
+                "1. Create an account.\n2. Deposit money\n3. Withdraw money. \n4. View balance.\n5. Transfer.\n6. Find account by email.\n7. Exit.\nChoose(1|2|3|4|5|6|7):")
 
             match options:
-                case "1":
-                    self.register.run()
-                case "2":
-                    self.deposit.run()
-                case "3":
-                    self.withdraw.run()
-                case "4":
-                    self.view_balance.run()
-                case "5":
-                    self.transfer.run()
-                case "6":
+                case "1" | "2" | "3" | "4" | "5" | "6":
+                    handler = self.handler(options)
+                    metrics.count(f"menu.{type(handler).__name__}")
+                    handler.run()
+                case "7":
                     break
                 case _:
-                    print("Wrong option. Choose between 1 to 6.")
+                    print("Wrong option. Choose between 1 to 7.")
+
+
+def main():
+    metrics.install()
+    Main(name="Mibank", founded=2025).run()
 
 
-main = Main(name="Mibank", founded=2025)
-main.run()
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,26 @@
+import sys
+import time
+
+import config
+from repository import AccountRepository
+from sqlite_repository import SqliteRepository
+
+
+def migrate(json_file="store.json", sqlite_file=config.SQLITE_FILE, batch_size=10_000):
+    # Go through AccountRepository so accounts still sitting in the journal come along too.
+    accounts = AccountRepository(name_of_file=json_file).accounts
+
+    database = SqliteRepository(name_of_file=sqlite_file)
+    database.import_accounts(accounts, batch_size=batch_size)
+    total = database.count()
+    database.close()
+    return total
+
+
+if __name__ == "__main__":
+    json_file = sys.argv[1] if len(sys.argv) > 1 else "store.json"
+    sqlite_file = sys.argv[2] if len(sys.argv) > 2 else config.SQLITE_FILE
+
+    start = time.perf_counter()
+    total = migrate(json_file, sqlite_file)
+    print(f"Imported {json_file} into {sqlite_file}: {total} accounts in {time.perf_counter() - start:.2f}s")
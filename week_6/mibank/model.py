@@ -1,15 +1,66 @@
 import json
+import re
+
+import config
+from metrics import timer
+from serialization import CODECS, MarshalCodec, detect
+
+DECODER = json.JSONDecoder()
+# Whitespace and commas between the accounts of a list.
+SEPARATOR = re.compile(r"[\s,]*")
 
 
 class Model:
     @staticmethod
-    def save_a_file(name_of_file, content):
-        with open(name_of_file, "w") as store:
-            convert_to_json = json.dumps(content)
-            store.write(convert_to_json)
+    def save_a_file(name_of_file, content, codec=None):
+        # codec is a name from serialization.CODECS; config.CODEC by default.
+        with timer("model.save_a_file") as timing:
+            data = CODECS[codec or config.CODEC].encode(content)
+            timing.size = len(data)
+            with open(name_of_file, "wb") as store:
+                store.write(data)
 
     @staticmethod
     def load_a_file(name_of_file):
+        # Whatever codec wrote the file, its first bytes tell which one it was.
+        with timer("model.load_a_file") as timing:
+            with open(name_of_file, "rb") as store:
+                content = store.read()
+            timing.size = len(content)
+            return detect(content).decode(content)
+
+    @staticmethod
+    def stream_a_file(name_of_file, chunk_size=1 << 16):
+        # A binary store is decoded in one go; it is much faster to read than JSON.
+        with open(name_of_file, "rb") as store:
+            binary = store.read(len(MarshalCodec.MAGIC)) == MarshalCodec.MAGIC
+        if binary:
+            yield from Model.load_a_file(name_of_file)
+            return
+
+        # Yield the accounts in a store.json list one at a time, holding only
+        # one chunk of text and one account in memory.
         with open(name_of_file) as store:
-            content = json.loads(store.read())
-            return content
+            buffer = store.read(chunk_size).lstrip()
+            if not buffer.startswith("["):
+                raise ValueError(f"{name_of_file} does not hold a list of accounts")
+            position = 1
+
+            while True:
+                position = SEPARATOR.match(buffer, position).end()
+                if buffer.startswith("]", position):
+                    return
+
+                try:
+                    user, end = DECODER.raw_decode(buffer, position)
+                except json.JSONDecodeError:
+                    # The account runs past the end of the buffer; read more.
+                    chunk = store.read(chunk_size)
+                    if not chunk:
+                        raise
+                    buffer = buffer[position:] + chunk
+                    position = 0
+                    continue
+
+                yield user
+                position = end
@@ -1,39 +1,30 @@
-from model import Model
-
-
-class Transfer(Model):
-    def __init__(self):
-        self.accounts = self.load_a_file("store.json")
+class Transfer:
+    def __init__(self, repository):
+        self.repository = repository
 
     def run(self):
-        sender_account = input("What is your account number: ")
+        self.repository.refresh()
 
-        for sender_acc_in_database in self.accounts:
-            if int(sender_account) == sender_acc_in_database['account_number']:
-                receiver_account = input("Who do you want to send to?: ")
+        sender_account = input("What is your account number: ")
 
-                for receiver_acc_in_database in self.accounts:
-                    if int(receiver_account) == receiver_acc_in_database['account_number']:
-                        amount = input("How much do you want to transfer?: ")
+        sender_acc_in_database = self.repository.find(sender_account)
+        if sender_acc_in_database is None:
+            print("outer: No such account number was found.")
+            return
 
-                        if sender_acc_in_database['account_balance'] < float(amount):
-                            print(
-                                f"{"==" * 24}\nInsufficient funds.\n{"==" * 24}")
-                            return
+        receiver_account = input("Who do you want to send to?: ")
 
-                        sender_acc_in_database["account_balance"] -= float(
-                            amount)
-                        receiver_acc_in_database["account_balance"] += float(
-                            amount)
+        receiver_acc_in_database = self.repository.find(receiver_account)
+        if receiver_acc_in_database is None:
+            print("No such account number was found.")
+            return
 
-                        self.save_a_file(
-                            name_of_file="store.json", content=self.accounts)
+        amount = input("How much do you want to transfer?: ")
 
-                        print(
-                            f"{"==" * 24}\nYou have transferred {amount} to {receiver_acc_in_database["account_number"]}.\nYour current balance is {sender_acc_in_database["account_balance"]}.\n{"==" * 24}")
-                        return
-                else:
-                    print("No such account number was found.")
+        if not self.repository.transfer(sender_acc_in_database, receiver_acc_in_database, float(amount)):
+            print(
+                f"{"==" * 24}\nInsufficient funds.\n{"==" * 24}")
+            return
 
-        else:
-            print("outer: No such account number was found.")
+        print(
+            f"{"==" * 24}\nYou have transferred {amount} to {receiver_acc_in_database["account_number"]}.\nYour current balance is {sender_acc_in_database["account_balance"]}.\n{"==" * 24}")
@@ -1,23 +1,26 @@
-import random
-from model import Model
-
-
-class Register(Model):
-    def __init__(self):
-        self.accounts = self.load_a_file(name_of_file="store.json")
+class Register:
+    def __init__(self, repository):
+        self.repository = repository
 
     def run(self):
+        self.repository.refresh()
+
         name = input("What is your name: ")
         email = input("What is your email address: ")
 
+        if self.repository.find_by_email(email) is not None:
+            print(f"{"==" * 24}\nAn account with this email already exists.\n{"==" * 24}")
+            return
+
         # Generate account nummber
-        account_no = random.randint(1000000000, 9999999999)
+        account_no = self.repository.allocator.allocate()
 
         user = {"name": name, "email": email,
                 "account_number": account_no, "account_balance": 0}
-        self.accounts.append(user)
-
-        self.save_a_file(name_of_file="store.json", content=self.accounts)
+        if not self.repository.add(user):
+            # Someone registered the same email in the meantime.
+            print(f"{"==" * 24}\nAn account with this email already exists.\n{"==" * 24}")
+            return
 
         print(
             f"{"==" * 24}\nYour account is created.\nYour account number is {account_no}\n{"==" * 24}")
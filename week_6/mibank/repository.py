@@ -0,0 +1,432 @@
+import os
+import threading
+
+import config
+from allocator import AccountNumberAllocator
+from checkpoint import columns_of, read_checkpoint, write_checkpoint
+from commit_manager import CommitManager
+from journal import Journal
+from locking import FileLock
+from metrics import timed
+from model import Model
+
+
+def normalize_email(email):
+    return email.strip().lower()
+
+
+class AccountRepository(Model):
+    def __init__(self, name_of_file="store.json", journaled=config.JOURNALED,
+                 compact_every=config.COMPACT_EVERY, autosave=True, resolver=None,
+                 checkpoints=config.CHECKPOINTS, durability=config.DURABILITY,
+                 compact_ratio=config.COMPACT_RATIO):
+        if checkpoints and not journaled:
+            # Without a journal every commit compacts, under the commit lock,
+            # and a checkpoint cannot be taken there.
+            raise ValueError("Checkpoints need the journal: set JOURNALED with CHECKPOINTS")
+        self.name_of_file = name_of_file
+        self.journaled = journaled
+        self.compact_every = compact_every
+        self.compact_ratio = compact_ratio
+        # With autosave off, changes stay in memory until flush(); dirty holds
+        # the account numbers changed since.
+        self.autosave = autosave
+        self.dirty = set()
+        # Journal appends are made durable according to this policy; see wait().
+        self.commits = CommitManager(durability)
+        self.journal = Journal(name_of_file + ".log", commits=self.commits)
+
+        # With checkpoints on, the binary checkpoint replaces store.json as the
+        # snapshot, and the journal is rotated aside while one is being written.
+        self.checkpoints = checkpoints
+        self.checkpoint_file = name_of_file + ".checkpoint"
+        self.rotated = Journal(name_of_file + ".log.checkpointing", commits=self.commits)
+        self.checkpoint_lock = FileLock(name_of_file + ".checkpoint.lock")
+        # The Checkpointer folding the journal in, if this process runs one.
+        # Without it, wait() checkpoints once compaction_due().
+        self.checkpointer = None
+
+        # Held around every read-check-write against the files, by every
+        # process using this store. Commits are serialized per store: a finer
+        # lock per account would still have to take this one to append to the
+        # journal, so it would only add overhead.
+        self.commit_lock = FileLock(name_of_file + ".lock")
+        self.allocator = AccountNumberAllocator(name_of_file + ".counter", self.commit_lock,
+                                                lambda account_no: account_no in self.index)
+
+        self.accounts = []
+        # account_number -> the same dict that lives in self.accounts
+        self.index = {}
+        # normalize_email(email) -> the same dict, for the first account with that email
+        self.emails = {}
+        # Two-phase commit: prepared changes by transaction id, waiting for a
+        # commit or abort record. resolver(txid) says how an interrupted one ended.
+        self.pending = {}
+        self.resolver = resolver
+        # Called with the stored records that changed; see watch().
+        self.listeners = []
+        self.loading = False
+        self.seen = None
+        with self.commit_lock:
+            self.load()
+
+    @timed("repository.load")
+    def load(self):
+        self.journal.close()
+        self.journal.records = 0
+        self.journal.offset = 0
+
+        # Build the list and the index in one streaming pass, without holding
+        # the whole file as one string.
+        self.accounts = []
+        self.index = {}
+        self.emails = {}
+        self.pending = {}
+        self.loading = True
+        try:
+            if self.checkpoints and os.path.exists(self.checkpoint_file):
+                users = read_checkpoint(self.checkpoint_file)
+            else:
+                users = self.stream_a_file(name_of_file=self.name_of_file)
+            for user in users:
+                self.accounts.append(user)
+                self.index[user["account_number"]] = user
+                self.emails.setdefault(normalize_email(user["email"]), user)
+
+            # Records are idempotent, so replaying a rotated journal that the
+            # checkpoint already covers does no harm.
+            for record in self.rotated.replay(repair=False):
+                self.apply(record)
+            for record in self.journal.replay():
+                self.apply(record)
+        finally:
+            self.loading = False
+
+        self.seen = self.signature()
+        # Everything may have changed; tell listeners once rather than per record.
+        for listener in self.listeners:
+            listener(self.accounts)
+        self.resolve_pending()
+
+    def signature(self):
+        # (mtime, size) of the snapshots and the journal, journal last. Any write
+        # from outside this repository changes at least one of them.
+        files = []
+        for name_of_file in (self.name_of_file, self.checkpoint_file, self.rotated.name_of_file,
+                             self.journal.name_of_file):
+            try:
+                stat = os.stat(name_of_file)
+            except FileNotFoundError:
+                files.append(None)
+            else:
+                files.append((stat.st_mtime_ns, stat.st_size))
+        return tuple(files)
+
+    @timed("repository.refresh")
+    def refresh(self):
+        with self.commit_lock:
+            current = self.signature()
+            if current == self.seen:
+                return
+
+            journal = current[-1]
+            if current[:-1] == self.seen[:-1] and journal is not None and journal[1] >= self.journal.offset:
+                # Only other processes' appends: replay what they added.
+                for record in self.journal.replay(self.journal.offset):
+                    self.apply(record)
+                self.seen = self.signature()
+                self.resolve_pending()
+            else:
+                self.load()
+
+    def locked(self, *account_numbers):
+        # Inside a batch this thread already holds the store, so nobody else
+        # can be touching these accounts or the files.
+        if self.commit_lock.held():
+            return self.commit_lock
+        return Locked(self)
+
+    def find(self, account_number):
+        return self.index.get(int(account_number))
+
+    def find_by_email(self, email):
+        return self.emails.get(normalize_email(email))
+
+    def add(self, user):
+        # False when the email or the account number is already taken.
+        with self.locked(user["account_number"]):
+            if normalize_email(user["email"]) in self.emails or user["account_number"] in self.index:
+                return False
+            self.commit([user])
+            return True
+
+    @timed("repository.add_many")
+    def add_many(self, users):
+        # Freshly allocated numbers belong to nobody else yet, so the file lock
+        # is enough. Returns the users turned away for a duplicate email or an
+        # account number that is already taken.
+        with self.commit_lock:
+            self.refresh()
+
+            accepted, rejected, seen, numbers = [], [], set(), set()
+            for user in users:
+                email = normalize_email(user["email"])
+                account_no = user["account_number"]
+                if email in self.emails or email in seen or account_no in self.index or account_no in numbers:
+                    rejected.append(user)
+                else:
+                    seen.add(email)
+                    numbers.add(account_no)
+                    accepted.append(user)
+
+            if accepted:
+                self.commit(accepted)
+        self.wait()
+        return rejected
+
+    def deposit(self, user, amount):
+        with self.locked(user["account_number"]):
+            current = self.index[user["account_number"]]
+            self.commit([self.balance(current, current["account_balance"] + amount)])
+            user["account_balance"] = current["account_balance"]
+
+    def withdraw(self, user, amount):
+        with self.locked(user["account_number"]):
+            current = self.index[user["account_number"]]
+            if current["account_balance"] < amount:
+                user["account_balance"] = current["account_balance"]
+                return False
+
+            self.commit([self.balance(current, current["account_balance"] - amount)])
+            user["account_balance"] = current["account_balance"]
+            return True
+
+    def transfer(self, sender, receiver, amount):
+        with self.locked(sender["account_number"], receiver["account_number"]):
+            # Work on the stored records: a refresh above may have replaced the
+            # dicts the caller found earlier.
+            current_sender = self.index[sender["account_number"]]
+            current_receiver = self.index[receiver["account_number"]]
+            if current_sender["account_balance"] < amount:
+                sender["account_balance"] = current_sender["account_balance"]
+                return False
+
+            if current_sender is not current_receiver:
+                self.commit([self.balance(current_sender, current_sender["account_balance"] - amount),
+                             self.balance(current_receiver, current_receiver["account_balance"] + amount)])
+
+            sender["account_balance"] = current_sender["account_balance"]
+            receiver["account_balance"] = current_receiver["account_balance"]
+            return True
+
+    @staticmethod
+    def balance(user, account_balance):
+        return {"account_number": user["account_number"], "account_balance": account_balance}
+
+    def apply(self, record):
+        if "prepare" in record:
+            self.pending[record["prepare"]] = record["put"]
+            return
+        if "commit" in record:
+            record = {"put": self.pending.pop(record["commit"], [])}
+        elif "abort" in record:
+            self.pending.pop(record["abort"], None)
+            return
+
+        # A record is the new state of every account one operation touched, so
+        # applying it twice gives the same result as applying it once.
+        users = []
+        for changed in record["put"]:
+            user = self.index.get(changed["account_number"])
+            if user is None:
+                user = dict(changed)
+                self.accounts.append(user)
+                self.index[user["account_number"]] = user
+                self.emails.setdefault(normalize_email(user["email"]), user)
+            else:
+                user.update(changed)
+            users.append(user)
+
+        if self.listeners and not self.loading:
+            for listener in self.listeners:
+                listener(users)
+
+    def watch(self, listener):
+        # listener(users) runs after every change with the stored records it
+        # touched, and with every account after a reload.
+        self.listeners.append(listener)
+
+    def commit(self, changed):
+        record = {"put": changed}
+        self.apply(record)
+
+        if not self.autosave:
+            self.dirty.update(user["account_number"] for user in changed)
+            return
+
+        if not self.journaled:
+            self.compact()
+            self.seen = self.signature()
+            return
+
+        self.journal.append(record)
+        # Compaction drops the journal, so wait until no prepared change lives
+        # only there. With checkpoints the Checkpointer does this instead.
+        if not self.checkpoints and self.compaction_due():
+            self.compact()
+        self.seen = self.signature()
+
+    def compaction_due(self):
+        # Not while a prepared change lives only in the journal.
+        if self.journal.records < self.compact_every or self.pending:
+            return False
+        snapshot = self.seen[1] if self.checkpoints and self.seen[1] else self.seen[0]
+        return snapshot is None or self.journal.offset >= self.compact_ratio * snapshot[1]
+
+    @timed("repository.wait")
+    def wait(self):
+        # Returns once this thread's commits are as durable as the policy
+        # promises. Waits only once the commit lock is released, so a group can
+        # form; inside a batch the batch waits at the end instead. With no
+        # Checkpointer in this process, this is also where the journal is
+        # folded into a checkpoint once compaction_due().
+        if not self.commit_lock.held():
+            self.commits.wait()
+            if self.checkpoints and self.checkpointer is None and self.compaction_due():
+                self.checkpoint(background=False)
+
+    def prepare(self, txid, changed):
+        # Phase one: record the change durably without applying it. Callers
+        # hold this store's lock until finish().
+        record = {"prepare": txid, "put": changed}
+        self.journal.append(record)
+        self.commits.sync_now()
+        self.apply(record)
+        self.seen = self.signature()
+
+    def finish(self, txid, committed):
+        if committed:
+            self.commit_prepared({"commit": txid})
+        else:
+            self.commit_prepared({"abort": txid})
+
+    def commit_prepared(self, record):
+        self.apply(record)
+        self.journal.append(record)
+        # The coordinator may forget the decision once every shard has its
+        # outcome, so the outcome must not be lost.
+        self.commits.sync_now()
+        if not self.checkpoints and self.compaction_due():
+            self.compact()
+        self.seen = self.signature()
+
+    def resolve_pending(self):
+        # A prepared change with no outcome means its coordinator died mid-way.
+        # Without a resolver this store cannot tell, so it leaves them pending.
+        if self.resolver is None:
+            return
+        for txid in list(self.pending):
+            self.finish(txid, self.resolver(txid))
+
+    @timed("repository.flush")
+    def flush(self):
+        if not self.dirty:
+            return
+
+        if self.checkpoints:
+            # One journal record with every account the batch changed; the
+            # Checkpointer folds it in later.
+            self.journal.append({"put": [dict(self.index[account_no]) for account_no in self.dirty]})
+        else:
+            self.compact()
+        self.seen = self.signature()
+        self.dirty = set()
+
+    @timed("repository.compact")
+    def compact(self):
+        if self.checkpoints:
+            self.checkpoint(background=False)
+            return
+
+        self.save()
+        if self.journal.records:
+            self.journal.clear()
+
+    def checkpoint(self, background=True):
+        if background:
+            writer = threading.Thread(target=self.checkpoint, args=(False,), name="mibank-checkpoint")
+            writer.start()
+            return writer
+
+        # One checkpoint at a time per store, across processes, from capture
+        # until the rotated journal is gone. The checkpoint lock is always taken
+        # before the commit lock, never the other way round.
+        if self.commit_lock.held():
+            raise RuntimeError("checkpoint() cannot run while holding the commit lock")
+
+        with self.checkpoint_lock:
+            with self.commit_lock:
+                self.refresh()
+                if self.pending:
+                    # A prepared transfer lives only in the journal; try again later.
+                    return None
+
+                if os.path.exists(self.rotated.name_of_file):
+                    # A checkpoint crashed part way. Redo it in one go.
+                    write_checkpoint(self.checkpoint_file, columns_of(self.accounts))
+                    os.remove(self.rotated.name_of_file)
+                    self.journal.clear()
+                    self.seen = self.signature()
+                    return None
+
+                # Only the copy happens under the commit lock. New commits go to
+                # a fresh journal while the copy is written out.
+                columns = columns_of(self.accounts)
+                self.journal.close()
+                if os.path.exists(self.journal.name_of_file):
+                    os.replace(self.journal.name_of_file, self.rotated.name_of_file)
+                self.journal.records = 0
+                self.journal.offset = 0
+                self.seen = self.signature()
+
+            write_checkpoint(self.checkpoint_file + ".next", columns)
+
+            with self.commit_lock:
+                up_to_date = self.signature() == self.seen
+                os.replace(self.checkpoint_file + ".next", self.checkpoint_file)
+                if os.path.exists(self.rotated.name_of_file):
+                    os.remove(self.rotated.name_of_file)
+                if up_to_date:
+                    self.seen = self.signature()
+        return None
+
+    @timed("repository.save")
+    def save(self):
+        # Write next to the store and rename, so a crash never leaves half a snapshot.
+        temporary = self.name_of_file + ".tmp"
+        self.save_a_file(name_of_file=temporary, content=self.accounts)
+        # Compaction clears the journal next, so the snapshot must be on disk
+        # first under every policy: "async" may lose recent records, never the store.
+        with open(temporary, "rb") as store:
+            os.fsync(store.fileno())
+        os.replace(temporary, self.name_of_file)
+
+
+class Locked:
+    def __init__(self, repository):
+        self.repository = repository
+
+    def __enter__(self):
+        self.repository.commit_lock.__enter__()
+
+        # Another process may have committed since we last looked.
+        try:
+            self.repository.refresh()
+        except BaseException:
+            self.__exit__(None, None, None)
+            raise
+        return self
+
+    def __exit__(self, *exc_info):
+        self.repository.commit_lock.__exit__(*exc_info)
+        self.repository.wait()
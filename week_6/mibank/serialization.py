@@ -0,0 +1,68 @@
+import json
+import marshal
+import os
+import sys
+
+from checkpoint import accounts_of, columns_of
+
+ACCOUNT_KEYS = {"name", "email", "account_number", "account_balance"}
+
+
+class JsonCodec:
+    name = "json"
+
+    def encode(self, content):
+        return json.dumps(content).encode()
+
+    def decode(self, data):
+        return json.loads(data)
+
+
+# marshal of plain Python values behind a magic header. A list of accounts is
+# stored as four columns, which marshal writes and reads much faster than
+# a million small dicts.
+class MarshalCodec:
+    name = "marshal"
+    MAGIC = b"MIBS1\n"
+
+    def encode(self, content):
+        if isinstance(content, list) and content and all(user.keys() == ACCOUNT_KEYS for user in content):
+            return self.MAGIC + b"C" + marshal.dumps(columns_of(content))
+        return self.MAGIC + b"V" + marshal.dumps(content)
+
+    def decode(self, data):
+        body = memoryview(data)[len(self.MAGIC) + 1:]
+        if data[len(self.MAGIC):len(self.MAGIC) + 1] == b"C":
+            return accounts_of(marshal.loads(body))
+        return marshal.loads(body)
+
+
+CODECS = {"json": JsonCodec(), "marshal": MarshalCodec()}
+
+
+def detect(head):
+    # Files without the marshal header are JSON, so stores written before
+    # codecs existed still open.
+    if head.startswith(MarshalCodec.MAGIC):
+        return CODECS["marshal"]
+    return CODECS["json"]
+
+
+def convert(name_of_file, codec):
+    # Rewrites the file in place; the journal and checkpoint are not touched.
+    with open(name_of_file, "rb") as store:
+        data = store.read()
+    content = detect(data).decode(data)
+
+    temporary = name_of_file + ".tmp"
+    with open(temporary, "wb") as store:
+        store.write(CODECS[codec].encode(content))
+    os.replace(temporary, name_of_file)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3 or sys.argv[2] not in CODECS:
+        sys.exit(f"usage: python serialization.py <store.json> <{'|'.join(CODECS)}>")
+
+    convert(sys.argv[1], sys.argv[2])
+    print(f"Wrote {sys.argv[1]} as {sys.argv[2]}: {os.path.getsize(sys.argv[1]):,} bytes")
@@ -0,0 +1,188 @@
+import argparse
+import asyncio
+import json
+import sys
+
+import config
+import metrics
+from batch import Batch
+from checkpoint import Checkpointer
+from repository import AccountRepository
+
+ENCODER = json.JSONEncoder(check_circular=False)
+WRITES = {"register", "deposit", "withdraw", "transfer"}
+
+
+class Server:
+    def __init__(self, repository):
+        self.repository = repository
+        # Batch already knows how to apply one operation and describe the result.
+        self.operations = Batch(repository)
+        self.writes = asyncio.Queue()
+        # Held while a group is applied on a worker thread: a reload there
+        # empties the index first, so reads wait rather than miss an account.
+        self.applying = asyncio.Lock()
+        # The event loop keeps only weak references to tasks.
+        self.tasks = set()
+
+    def balance(self, request):
+        user = self.repository.find(request["account_number"])
+        if user is None:
+            return {"ok": False, "error": "No such account number was found."}
+        return {"ok": True, "account_balance": user["account_balance"]}
+
+    def email(self, request):
+        user = self.repository.find_by_email(request["email"])
+        if user is None:
+            return {"ok": False, "error": "No account with this email was found."}
+        return {"ok": True, "account_number": user["account_number"], "name": user["name"]}
+
+    async def writer(self):
+        # The only task that changes the store, so commits never interleave.
+        while True:
+            group = [await self.writes.get()]
+            while not self.writes.empty():
+                group.append(self.writes.get_nowait())
+
+            # Waiting for the store's lock blocks, for as long as another
+            # process holds it, so the group is applied on a worker thread and
+            # reads and new connections keep being served meanwhile.
+            try:
+                async with self.applying:
+                    ticket, answered = await asyncio.to_thread(self.apply_group, group)
+            except Exception as error:
+                for _, answer in group:
+                    answer.set_result({"ok": False, "error": f"Store unavailable: {error!r}"})
+                continue
+            self.spawn(self.acknowledge(ticket, answered))
+
+    def spawn(self, coroutine):
+        task = asyncio.create_task(coroutine)
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    def apply_group(self, group):
+        # Apply everything queued under one hold of the store, then answer once
+        # it is durable. The next group is applied meanwhile and can share the
+        # same fsync. The ticket is per thread, so it is taken here.
+        answered = []
+        with self.repository.commit_lock:
+            self.repository.refresh()
+            for request, answer in group:
+                try:
+                    result = self.operations.apply(request)
+                except Exception as error:
+                    # Whatever one request does wrong, the writer must live on
+                    # for the others.
+                    result = {"ok": False, "error": f"Bad operation: {error!r}"}
+                answered.append((answer, result))
+        return self.repository.commits.ticket(), answered
+
+    async def acknowledge(self, ticket, answered):
+        await asyncio.to_thread(self.repository.commits.wait, ticket)
+        for answer, result in answered:
+            answer.set_result(result)
+
+    def read(self, op, request):
+        try:
+            return self.balance(request) if op == "balance" else self.email(request)
+        except (KeyError, TypeError, AttributeError) as error:
+            return {"ok": False, "error": f"Bad request: {error!r}"}
+
+    async def read_fresh(self, op, request, answer):
+        # Another process may have written since this one last looked, and the
+        # lock to catch up on blocks, so that happens on a worker thread.
+        async with self.applying:
+            try:
+                if self.repository.signature() != self.repository.seen:
+                    await asyncio.to_thread(self.repository.refresh)
+                answer.set_result(self.read(op, request))
+            except Exception as error:
+                answer.set_result({"ok": False, "error": f"Store unavailable: {error!r}"})
+
+    def handle(self, line):
+        # Returns a future, so a connection can keep reading requests while
+        # earlier ones are still queued behind the writer.
+        answer = asyncio.get_running_loop().create_future()
+        try:
+            request = json.loads(line)
+            op = request.get("op")
+        except (ValueError, AttributeError) as error:
+            answer.set_result({"ok": False, "error": f"Bad request: {error!r}"})
+            return None, answer
+
+        if op in ("balance", "email"):
+            # Answered right here when nothing is being applied and the files
+            # are as this process last saw them.
+            if self.applying.locked() or self.repository.signature() != self.repository.seen:
+                self.spawn(self.read_fresh(op, request, answer))
+            else:
+                answer.set_result(self.read(op, request))
+        elif op in WRITES:
+            self.writes.put_nowait((request, answer))
+        else:
+            answer.set_result({"ok": False, "error": f"Unknown operation: {op}"})
+        return request.get("id"), answer
+
+    async def connection(self, reader, writer):
+        # Pipelining: requests are read as fast as they arrive and answered in
+        # the order they came in.
+        pending = asyncio.Queue()
+
+        async def respond():
+            while True:
+                item = await pending.get()
+                if item is None:
+                    break
+                request_id, answer = item
+                result = await answer
+                result["id"] = request_id
+                writer.write(ENCODER.encode(result).encode() + b"\n")
+                if pending.empty():
+                    await writer.drain()
+
+        responder = asyncio.create_task(respond())
+        try:
+            while line := await reader.readline():
+                if line.strip():
+                    pending.put_nowait(self.handle(line))
+        finally:
+            pending.put_nowait(None)
+            await responder
+            writer.close()
+
+    async def serve(self, host, port):
+        writer = asyncio.create_task(self.writer())
+        server = await asyncio.start_server(self.connection, host, port)
+        print(f"mibank listening on {host}:{port}")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            writer.cancel()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve mibank operations over TCP, one JSON request per line.")
+    parser.add_argument("--store", default="store.json")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    arguments = parser.parse_args()
+    if config.BACKEND != "json":
+        # The writer applies requests through Batch, so the same store as batch mode.
+        sys.exit(f"The server needs the json backend; config.BACKEND is {config.BACKEND!r}")
+    metrics.install()
+
+    repository = AccountRepository(name_of_file=arguments.store)
+    if config.CHECKPOINTS:
+        Checkpointer(repository, config.CHECKPOINT_INTERVAL).start()
+
+    server = Server(repository)
+    try:
+        asyncio.run(server.serve(arguments.host, arguments.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import config
+import metrics
+from batch import NOT_AN_AMOUNT, amount_of
+from metrics import timed
+from repository import AccountRepository
+
+# Relative headroom an account needs to skip the ordered replay, so float
+# rounding can never let a borderline account through.
+SLACK = 1e-9
+
+
+def fold(balances, rows, deltas):
+    # np.add.at is unbuffered: an account's changes land one by one in batch
+    # order, so the float result is exactly that of applying them in sequence.
+    np.add.at(balances, rows, deltas)
+    return balances
+
+
+def settle(balances, senders, receivers, amounts, workers=1):
+    # balances is indexed by row; senders and receivers hold rows. Returns the
+    # new balances and which transfers went through: the same as applying the
+    # transfers one at a time in order, skipping any that would overdraw.
+    # Amounts must be positive.
+    count = len(balances)
+
+    # An account holding everything it sends never fails a check, whatever
+    # order things arrive in. Only the others need the transfers in order.
+    outgoing = np.bincount(senders, weights=amounts, minlength=count)
+    safe = (outgoing == 0) | (balances - outgoing > SLACK * (np.abs(balances) + outgoing))
+    hot = ~safe
+
+    accepted = np.ones(len(amounts), dtype=bool)
+    replay = np.flatnonzero(hot[senders] | hot[receivers])
+    if len(replay):
+        current = balances.tolist()
+        is_hot = hot.tolist()
+        for position, sender, receiver, amount in zip(replay.tolist(), senders[replay].tolist(),
+                                                      receivers[replay].tolist(), amounts[replay].tolist()):
+            if is_hot[sender]:
+                if current[sender] < amount:
+                    accepted[position] = False
+                    continue
+                if sender == receiver:
+                    continue
+                current[sender] -= amount
+            if is_hot[receiver] and sender != receiver:
+                current[receiver] += amount
+
+    # Every accepted transfer is now unconditional: fold the deltas in per
+    # account, each range of rows in its own process.
+    moving = accepted & (senders != receivers)
+    rows = np.empty(2 * np.count_nonzero(moving), dtype=np.int64)
+    deltas = np.empty(len(rows), dtype=np.float64)
+    rows[0::2], rows[1::2] = senders[moving], receivers[moving]
+    deltas[0::2], deltas[1::2] = -amounts[moving], amounts[moving]
+
+    balances = balances.copy()
+    if workers <= 1 or len(rows) < 100_000:
+        return fold(balances, rows, deltas), accepted
+
+    bounds = np.linspace(0, count, workers + 1).astype(np.int64)
+    part = np.searchsorted(bounds, rows, side="right") - 1
+    order = np.argsort(part, kind="stable")
+    cuts = np.searchsorted(part[order], np.arange(workers + 1))
+    with ProcessPoolExecutor(workers) as pool:
+        folded = pool.map(fold,
+                          [balances[bounds[index]:bounds[index + 1]] for index in range(workers)],
+                          [rows[order[cuts[index]:cuts[index + 1]]] - bounds[index] for index in range(workers)],
+                          [deltas[order[cuts[index]:cuts[index + 1]]] for index in range(workers)])
+        return np.concatenate(list(folded)), accepted
+
+
+class Settlement:
+    def __init__(self, repository, workers=os.cpu_count()):
+        self.repository = repository
+        self.workers = workers
+
+    @timed("settlement.run")
+    def run(self, transfers):
+        # transfers are {"sender", "receiver", "amount"} dicts. Returns one
+        # result per transfer, in the shape batch mode uses.
+        results = [None] * len(transfers)
+        with self.repository.commit_lock:
+            self.repository.refresh()
+            index = self.repository.index
+
+            valid = []
+            for position, transfer in enumerate(transfers):
+                try:
+                    sender = self.repository.find(transfer["sender"])
+                    receiver = self.repository.find(transfer["receiver"])
+                    amount = amount_of(transfer)
+                except Exception as error:
+                    # One bad row is a failed transfer, never the end of the settlement.
+                    results[position] = {"ok": False, "error": f"Bad operation: {error!r}"}
+                    continue
+
+                if sender is None:
+                    results[position] = {"ok": False, "error": "Sender account not found."}
+                elif receiver is None:
+                    results[position] = {"ok": False, "error": "Receiver account not found."}
+                elif amount is None:
+                    results[position] = dict(NOT_AN_AMOUNT)
+                else:
+                    valid.append((position, sender["account_number"], receiver["account_number"], amount))
+
+            count = len(valid)
+            senders = np.fromiter((row[1] for row in valid), np.int64, count)
+            receivers = np.fromiter((row[2] for row in valid), np.int64, count)
+            amounts = np.fromiter((row[3] for row in valid), np.float64, count)
+
+            # Rows cover only the accounts this batch touches.
+            numbers, rows = np.unique(np.concatenate([senders, receivers]), return_inverse=True)
+            numbers = numbers.tolist()
+            before = np.fromiter((index[account_no]["account_balance"] for account_no in numbers),
+                                 np.float64, len(numbers))
+
+            after, accepted = settle(before, rows[:count], rows[count:], amounts, self.workers)
+
+            changed = np.flatnonzero(after != before).tolist()
+            if changed:
+                balances = after.tolist()
+                self.repository.commit([self.repository.balance(index[numbers[row]], balances[row])
+                                        for row in changed])
+        self.repository.wait()
+
+        for (position, *_), ok in zip(valid, accepted.tolist()):
+            results[position] = {"ok": True} if ok else {"ok": False, "error": "Insufficient funds."}
+        return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Settle a JSONL file of mibank transfers in one pass.")
+    parser.add_argument("transfers", help='JSONL file of {"sender", "receiver", "amount"}')
+    parser.add_argument("--store", default="store.json")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--results", help="write one JSON result per transfer to this file")
+    arguments = parser.parse_args()
+    if config.BACKEND != "json":
+        # Settlement reads and commits through AccountRepository's index.
+        sys.exit(f"Settlement needs the json backend; config.BACKEND is {config.BACKEND!r}")
+    metrics.install()
+
+    with open(arguments.transfers) as source:
+        transfers = [json.loads(line) for line in source if line.strip()]
+
+    start = time.perf_counter()
+    results = Settlement(AccountRepository(name_of_file=arguments.store), arguments.workers).run(transfers)
+    elapsed = time.perf_counter() - start
+
+    if arguments.results:
+        with open(arguments.results, "w") as output:
+            output.writelines(json.dumps(result) + "\n" for result in results)
+
+    settled = sum(result["ok"] for result in results)
+    print(f"{len(results)} transfers: {settled} settled, {len(results) - settled} rejected, {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+import os
+import sys
+import uuid
+from contextlib import ExitStack
+
+import config
+from allocator import FIRST, SIZE, AccountNumberAllocator
+from commit_manager import CommitManager
+from journal import Journal
+from locking import FileLock
+from metrics import timed
+from model import Model
+from repository import AccountRepository, normalize_email
+
+
+def shard_of(account_number, shards):
+    # Equal ranges of the account-number space. Allocated and older random
+    # numbers are both spread evenly over it, so the shards stay balanced.
+    position = (account_number - FIRST) * shards // SIZE
+    return min(max(position, 0), shards - 1)
+
+
+def shard_file(name_of_file, index):
+    base, extension = os.path.splitext(name_of_file)
+    return f"{base}.shard{index}{extension}"
+
+
+class ShardedRepository:
+    def __init__(self, name_of_file="store.json", shards=config.SHARDS, checkpoints=config.CHECKPOINTS):
+        self.name_of_file = name_of_file
+        self.lock = FileLock(name_of_file + ".lock")
+        # Commit decisions for transfers that span two shards.
+        self.coordinator = Journal(name_of_file + ".2pc.log", commits=CommitManager())
+
+        with self.lock:
+            self.count = self.shard_count(shards)
+            for index in range(self.count):
+                if not os.path.exists(shard_file(name_of_file, index)):
+                    Model.save_a_file(name_of_file=shard_file(name_of_file, index), content=[])
+
+        # Opening a shard settles any transfer a crashed process left half done.
+        self.shards = [AccountRepository(name_of_file=shard_file(name_of_file, index),
+                                         journaled=True, resolver=self.committed, checkpoints=checkpoints)
+                       for index in range(self.count)]
+        self.trim_coordinator()
+
+        self.allocator = AccountNumberAllocator(name_of_file + ".counter", self.lock,
+                                                lambda account_no: self.find(account_no) is not None)
+
+    def shard_count(self, shards):
+        meta = self.name_of_file + ".shards"
+        if os.path.exists(meta):
+            layout = Model.load_a_file(name_of_file=meta)
+            if layout.get("rebalancing"):
+                raise RuntimeError(f"{self.name_of_file} is half rebalanced; run the rebalance again")
+            return layout["count"]
+
+        Model.save_a_file(name_of_file=meta, content={"count": shards})
+        return shards
+
+    def shard(self, account_number):
+        return self.shards[shard_of(int(account_number), self.count)]
+
+    def committed(self, txid):
+        # Only asked about a transfer whose coordinator has died, so nobody is
+        # writing its decision any more.
+        for record in Journal(self.coordinator.name_of_file).replay(repair=False):
+            if record.get("commit") == txid:
+                return True
+        return False
+
+    def all_locked(self):
+        # Same order as transfer(): shards by index, then the coordinator.
+        stack = ExitStack()
+        for shard in self.shards:
+            stack.enter_context(shard.commit_lock)
+        stack.enter_context(self.lock)
+        return stack
+
+    def trim_coordinator(self):
+        # Once no shard holds a prepared change, old decisions are not needed.
+        with self.all_locked():
+            for shard in self.shards:
+                shard.refresh()
+            if all(not shard.pending for shard in self.shards):
+                self.coordinator.clear()
+
+    @timed("sharded.refresh")
+    def refresh(self):
+        for shard in self.shards:
+            shard.refresh()
+
+    def watch(self, listener):
+        for shard in self.shards:
+            shard.watch(listener)
+
+    @property
+    def accounts(self):
+        return [user for shard in self.shards for user in shard.accounts]
+
+    def find(self, account_number):
+        return self.shard(account_number).find(account_number)
+
+    def find_by_email(self, email):
+        # Emails are not partitioned, so ask every shard: one dict lookup each.
+        for shard in self.shards:
+            user = shard.find_by_email(email)
+            if user is not None:
+                return user
+        return None
+
+    def add(self, user):
+        return not self.add_many([user])
+
+    @timed("sharded.add_many")
+    def add_many(self, users):
+        # The duplicate check spans every shard, so every shard stays locked
+        # from the check until the inserts are in.
+        with self.all_locked():
+            self.refresh()
+            accepted, rejected, seen, numbers = [], [], set(), set()
+            for user in users:
+                email = normalize_email(user["email"])
+                account_no = user["account_number"]
+                if (email in seen or account_no in numbers or self.find_by_email(email) is not None
+                        or self.find(account_no) is not None):
+                    rejected.append(user)
+                else:
+                    seen.add(email)
+                    numbers.add(account_no)
+                    accepted.append(user)
+
+            by_shard = {}
+            for user in accepted:
+                by_shard.setdefault(shard_of(user["account_number"], self.count), []).append(user)
+            for index, shard_users in by_shard.items():
+                self.shards[index].add_many(shard_users)
+        # The shards skipped their wait while we held their locks; the new
+        # accounts are durable only once each one's group has synced.
+        for index in by_shard:
+            self.shards[index].commits.wait()
+        return rejected
+
+    def deposit(self, user, amount):
+        self.shard(user["account_number"]).deposit(user, amount)
+
+    def withdraw(self, user, amount):
+        return self.shard(user["account_number"]).withdraw(user, amount)
+
+    @timed("sharded.transfer")
+    def transfer(self, sender, receiver, amount):
+        sender_shard = self.shard(sender["account_number"])
+        receiver_shard = self.shard(receiver["account_number"])
+        if sender_shard is receiver_shard:
+            return sender_shard.transfer(sender, receiver, amount)
+
+        # Lock the shards in index order, so two processes transferring in
+        # opposite directions cannot deadlock.
+        first, second = sorted([(sender_shard, sender), (receiver_shard, receiver)],
+                               key=lambda pair: self.shards.index(pair[0]))
+        with first[0].locked(first[1]["account_number"]), second[0].locked(second[1]["account_number"]):
+            current_sender = sender_shard.index[sender["account_number"]]
+            current_receiver = receiver_shard.index[receiver["account_number"]]
+            if current_sender["account_balance"] < amount:
+                sender["account_balance"] = current_sender["account_balance"]
+                return False
+
+            txid = uuid.uuid4().hex
+            prepared = []
+            try:
+                # Phase one: both shards durably record their half.
+                sender_shard.prepare(txid, [sender_shard.balance(current_sender,
+                                                                 current_sender["account_balance"] - amount)])
+                prepared.append(sender_shard)
+                receiver_shard.prepare(txid, [receiver_shard.balance(current_receiver,
+                                                                     current_receiver["account_balance"] + amount)])
+                prepared.append(receiver_shard)
+
+                # The decision. Once this line is in the log the transfer
+                # happens, even if we crash before telling the shards. Phase two
+                # stays under the lock so the log is never trimmed between the two.
+                with self.lock:
+                    self.coordinator.append({"commit": txid})
+                    self.coordinator.commits.sync_now()
+                    prepared = []
+                    sender_shard.finish(txid, True)
+                    receiver_shard.finish(txid, True)
+            except BaseException:
+                # Failed before the decision: abort the halves already
+                # prepared, so they do not hold compaction and checkpoints back
+                # until a restart. After it, recovery commits them instead.
+                for shard in prepared:
+                    try:
+                        shard.finish(txid, False)
+                    except Exception:
+                        pass
+                raise
+
+            sender["account_balance"] = current_sender["account_balance"]
+            receiver["account_balance"] = current_receiver["account_balance"]
+            return True
+
+    def flush(self):
+        for shard in self.shards:
+            shard.flush()
+
+
+def rebalance(name_of_file, shards, checkpoints=config.CHECKPOINTS):
+    # Offline: nothing else may have the store open while this runs.
+    meta = name_of_file + ".shards"
+    layout = Model.load_a_file(name_of_file=meta) if os.path.exists(meta) else {"count": config.SHARDS}
+
+    if not layout.get("rebalancing"):
+        old = ShardedRepository(name_of_file=name_of_file, checkpoints=checkpoints)
+        # Fold every journal into its snapshot, so the snapshots alone hold the store.
+        for shard in old.shards:
+            shard.compact()
+        accounts = [user for shard in old.shards for user in shard.accounts]
+
+        new_shards = [[] for _ in range(shards)]
+        for user in accounts:
+            new_shards[shard_of(user["account_number"], shards)].append(user)
+        for index, shard_accounts in enumerate(new_shards):
+            Model.save_a_file(name_of_file=shard_file(name_of_file, index) + ".new", content=shard_accounts)
+
+        # From here on the .new files are the store. A crash below is finished
+        # by running the rebalance again.
+        layout = {"count": layout["count"], "rebalancing": shards}
+        Model.save_a_file(name_of_file=meta, content=layout)
+
+    shards = layout["rebalancing"]
+    for index in range(max(layout["count"], shards)):
+        current = shard_file(name_of_file, index)
+        if os.path.exists(current + ".new"):
+            os.replace(current + ".new", current)
+        elif index >= shards and os.path.exists(current):
+            os.remove(current)
+        # A shard loads its checkpoint in preference to its JSON file, so the
+        # old checkpoints go with the old journals.
+        leftovers = [".log", ".checkpoint", ".log.checkpointing", ".checkpoint.next"]
+        if index >= shards:
+            leftovers += [".lock", ".checkpoint.lock", ".counter"]
+        for leftover in leftovers:
+            if os.path.exists(current + leftover):
+                os.remove(current + leftover)
+
+    Model.save_a_file(name_of_file=meta, content={"count": shards})
+    return sum(len(shard.accounts)
+               for shard in ShardedRepository(name_of_file=name_of_file, checkpoints=checkpoints).shards)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 4 or sys.argv[1] != "rebalance":
+        sys.exit("usage: python sharding.py rebalance <store.json> <shards>")
+
+    total = rebalance(sys.argv[2], int(sys.argv[3]))
+    print(f"Rebalanced {total} accounts into {sys.argv[3]} shards")
@@ -0,0 +1,160 @@
+import sqlite3
+
+import config
+from allocator import AccountNumberAllocator
+from locking import FileLock
+from metrics import timed
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS accounts (
+    account_number INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    email TEXT NOT NULL,
+    account_balance REAL NOT NULL
+)
+"""
+
+# Not UNIQUE: stores migrated from store.json may already hold duplicates.
+# add() refuses new ones.
+EMAIL_INDEX = "CREATE INDEX IF NOT EXISTS accounts_email ON accounts (lower(trim(email)))"
+
+COLUMNS = "name, email, account_number, account_balance"
+
+
+class SqliteRepository:
+    def __init__(self, name_of_file=config.SQLITE_FILE):
+        self.name_of_file = name_of_file
+
+        # Autocommit, so single statements commit on their own and transfers
+        # open their own transaction.
+        self.connection = sqlite3.connect(name_of_file, isolation_level=None)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute(SCHEMA)
+        self.connection.execute(EMAIL_INDEX)
+
+        self.allocator = AccountNumberAllocator(name_of_file + ".counter", FileLock(name_of_file + ".lock"),
+                                                lambda account_no: self.find(account_no) is not None)
+
+    def refresh(self):
+        # Every read goes to the database, so there is nothing to reload.
+        pass
+
+    @timed("sqlite.find")
+    def find(self, account_number):
+        row = self.connection.execute(
+            f"SELECT {COLUMNS} FROM accounts WHERE account_number = ?",
+            (int(account_number),)).fetchone()
+        return None if row is None else dict(row)
+
+    @timed("sqlite.find_by_email")
+    def find_by_email(self, email):
+        row = self.connection.execute(
+            f"SELECT {COLUMNS} FROM accounts WHERE lower(trim(email)) = ? LIMIT 1",
+            (email.strip().lower(),)).fetchone()
+        return None if row is None else dict(row)
+
+    def add(self, user):
+        return not self.add_many([user])
+
+    @timed("sqlite.add_many")
+    def add_many(self, users):
+        # The duplicate check and the inserts share one write transaction, so
+        # two registrations with the same email cannot both get in.
+        self.connection.execute("BEGIN IMMEDIATE")
+        try:
+            accepted, rejected, seen, numbers = [], [], set(), set()
+            for user in users:
+                email = user["email"].strip().lower()
+                account_no = user["account_number"]
+                if email in seen or account_no in numbers or self.connection.execute(
+                        "SELECT 1 FROM accounts WHERE lower(trim(email)) = ? OR account_number = ?",
+                        (email, account_no)).fetchone():
+                    rejected.append(user)
+                else:
+                    seen.add(email)
+                    numbers.add(account_no)
+                    accepted.append((user["name"], user["email"], user["account_number"], user["account_balance"]))
+
+            self.connection.executemany(
+                "INSERT INTO accounts (name, email, account_number, account_balance) VALUES (?, ?, ?, ?)",
+                accepted)
+            self.connection.execute("COMMIT")
+        except BaseException:
+            self.connection.execute("ROLLBACK")
+            raise
+        return rejected
+
+    @timed("sqlite.deposit")
+    def deposit(self, user, amount):
+        self.connection.execute(
+            "UPDATE accounts SET account_balance = account_balance + ? WHERE account_number = ?",
+            (amount, user["account_number"]))
+        self.reload_balance(user)
+
+    @timed("sqlite.withdraw")
+    def withdraw(self, user, amount):
+        # The balance check is part of the UPDATE, so two tellers cannot both
+        # spend the same money.
+        changed = self.connection.execute(
+            "UPDATE accounts SET account_balance = account_balance - ? "
+            "WHERE account_number = ? AND account_balance >= ?",
+            (amount, user["account_number"], amount)).rowcount
+        self.reload_balance(user)
+        return changed == 1
+
+    @timed("sqlite.transfer")
+    def transfer(self, sender, receiver, amount):
+        self.connection.execute("BEGIN IMMEDIATE")
+        try:
+            changed = self.connection.execute(
+                "UPDATE accounts SET account_balance = account_balance - ? "
+                "WHERE account_number = ? AND account_balance >= ?",
+                (amount, sender["account_number"], amount)).rowcount
+            if changed == 1:
+                self.connection.execute(
+                    "UPDATE accounts SET account_balance = account_balance + ? WHERE account_number = ?",
+                    (amount, receiver["account_number"]))
+            self.connection.execute("COMMIT")
+        except BaseException:
+            self.connection.execute("ROLLBACK")
+            raise
+
+        self.reload_balance(sender)
+        self.reload_balance(receiver)
+        return changed == 1
+
+    def reload_balance(self, user):
+        # Handlers print from the dict they found, so keep it current.
+        user["account_balance"] = self.connection.execute(
+            "SELECT account_balance FROM accounts WHERE account_number = ?",
+            (user["account_number"],)).fetchone()[0]
+
+    def import_accounts(self, accounts, batch_size=10_000):
+        self.connection.execute("BEGIN")
+        try:
+            batch = []
+            for user in accounts:
+                batch.append((user["name"], user["email"],
+                              user["account_number"], user["account_balance"]))
+                if len(batch) >= batch_size:
+                    self.insert_batch(batch)
+                    batch = []
+            if batch:
+                self.insert_batch(batch)
+            self.connection.execute("COMMIT")
+        except BaseException:
+            self.connection.execute("ROLLBACK")
+            raise
+
+    def insert_batch(self, batch):
+        self.connection.executemany(
+            "INSERT OR REPLACE INTO accounts (name, email, account_number, account_balance) VALUES (?, ?, ?, ?)",
+            batch)
+
+    def count(self):
+        return self.connection.execute("SELECT COUNT(*) FROM accounts").fetchone()[0]
+
+    def close(self):
+        self.connection.close()
@@ -0,0 +1,20 @@
+import config
+
+
+def open_repository(backend=config.BACKEND):
+    # Only the chosen backend is imported, so startup does not pay for the others.
+    match backend:
+        case "json":
+            from repository import AccountRepository
+            return AccountRepository(name_of_file="store.json")
+        case "sqlite":
+            from sqlite_repository import SqliteRepository
+            return SqliteRepository(name_of_file=config.SQLITE_FILE)
+        case "binary":
+            from binary_store import BinaryStore
+            return BinaryStore(name_of_file=config.BINARY_FILE)
+        case "sharded":
+            from sharding import ShardedRepository
+            return ShardedRepository(name_of_file="store.json", shards=config.SHARDS)
+        case _:
+            raise ValueError(f"Unknown mibank backend: {backend}")
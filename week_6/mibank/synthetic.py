@@ -0,0 +1,18 @@
+import random
+from model import Model
+
+
+def make_accounts(count, seed=2025):
+    generator = random.Random(seed)
+    numbers = generator.sample(range(1000000000, 9999999999), count)
+
+    return [{"name": f"user{position}", "email": f"user{position}@mibank.test",
+             "account_number": account_no,
+             "account_balance": float(generator.randint(0, 100000))}
+            for position, account_no in enumerate(numbers)]
+
+
+def write_store(name_of_file, count, seed=2025):
+    accounts = make_accounts(count, seed=seed)
+    Model.save_a_file(name_of_file=name_of_file, content=accounts)
+    return accounts
@@ -0,0 +1,46 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import repository
+from repository import AccountRepository
+
+
+class CheckpointRecoveryTests(unittest.TestCase):
+    def setUp(self):
+        folder = tempfile.TemporaryDirectory()
+        self.addCleanup(folder.cleanup)
+        self.name_of_file = os.path.join(folder.name, "store.json")
+        AccountRepository.save_a_file(name_of_file=self.name_of_file, content=[])
+
+        store = self.open()
+        store.add({"name": "owner", "email": "owner@example.com", "account_number": 1000000001,
+                   "account_balance": 0})
+        store.deposit(store.find(1000000001), 100.0)
+        store.checkpoint(background=False)
+        store.deposit(store.find(1000000001), 20.0)
+
+    def open(self):
+        return AccountRepository(name_of_file=self.name_of_file, checkpoints=True)
+
+    def test_crash_while_writing_checkpoint_loses_nothing(self):
+        store = self.open()
+        # The journal has been rotated aside when the write dies.
+        with mock.patch.object(repository, "write_checkpoint", side_effect=OSError("crash")):
+            with self.assertRaises(OSError):
+                store.checkpoint(background=False)
+        self.assertTrue(os.path.exists(store.rotated.name_of_file))
+
+        recovered = self.open()
+        self.assertEqual(recovered.find(1000000001)["account_balance"], 120.0)
+
+        # Commits made before the next checkpoint survive it too.
+        recovered.deposit(recovered.find(1000000001), 3.0)
+        recovered.checkpoint(background=False)
+        self.assertFalse(os.path.exists(recovered.rotated.name_of_file))
+        self.assertEqual(self.open().find(1000000001)["account_balance"], 123.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+import os
+import random
+import tempfile
+import unittest
+
+import numpy as np
+
+from repository import AccountRepository
+from settlement import Settlement, settle
+
+
+def sequential(balances, senders, receivers, amounts):
+    # The definition settle() must match: one transfer at a time, in order.
+    balances = list(balances)
+    accepted = []
+    for sender, receiver, amount in zip(senders, receivers, amounts):
+        if balances[sender] < amount:
+            accepted.append(False)
+            continue
+        if sender != receiver:
+            balances[sender] -= amount
+            balances[receiver] += amount
+        accepted.append(True)
+    return balances, accepted
+
+
+class SettleTests(unittest.TestCase):
+    def check(self, seed, accounts, transfers, workers=1):
+        generator = random.Random(seed)
+        # A few accounts with little money, so many transfers hinge on order.
+        balances = [generator.choice([0.0, 5.0, round(generator.uniform(0, 50), 2),
+                                      round(generator.uniform(0, 10_000), 2)]) for _ in range(accounts)]
+        senders = [generator.randrange(accounts) for _ in range(transfers)]
+        receivers = [generator.randrange(accounts) for _ in range(transfers)]
+        amounts = [round(generator.uniform(0.01, 100), 2) for _ in range(transfers)]
+
+        expected_balances, expected_accepted = sequential(balances, senders, receivers, amounts)
+        after, accepted = settle(np.array(balances), np.array(senders), np.array(receivers),
+                                 np.array(amounts), workers)
+        self.assertEqual(accepted.tolist(), expected_accepted)
+        self.assertEqual(after.tolist(), expected_balances)
+
+    def test_matches_sequential_application(self):
+        for seed in range(50):
+            with self.subTest(seed=seed):
+                self.check(seed, accounts=random.Random(seed).randint(2, 40), transfers=500)
+
+    def test_matches_sequential_application_across_workers(self):
+        # Enough accepted transfers that the fold is split between processes.
+        self.check(seed=7, accounts=1_000, transfers=80_000, workers=2)
+
+
+class SettlementRunTests(unittest.TestCase):
+    def setUp(self):
+        folder = tempfile.TemporaryDirectory()
+        self.addCleanup(folder.cleanup)
+        name_of_file = os.path.join(folder.name, "store.json")
+        AccountRepository.save_a_file(name_of_file=name_of_file, content=[])
+        self.repository = AccountRepository(name_of_file=name_of_file, checkpoints=False)
+        for account_no in (1000000001, 1000000002):
+            self.repository.add({"name": "owner", "email": f"{account_no}@example.com",
+                                 "account_number": account_no, "account_balance": 0})
+        self.repository.deposit(self.repository.find(1000000001), 100.0)
+
+    def test_malformed_rows_fail_alone(self):
+        results = Settlement(self.repository, workers=1).run([
+            {"sender": 1000000001, "receiver": 1000000002},
+            {"sender": "abc", "receiver": 1000000002, "amount": 5},
+            {"sender": 1000000001, "receiver": 1000000002, "amount": "nan"},
+            {"sender": 1000000001, "receiver": 1000000002, "amount": 30},
+            {"sender": 1000000001, "receiver": 999, "amount": 5},
+            {"sender": 1000000002, "receiver": 1000000001, "amount": 31},
+        ])
+        self.assertEqual([result["ok"] for result in results], [False, False, False, True, False, False])
+        self.assertIn("KeyError", results[0]["error"])
+        self.assertIn("ValueError", results[1]["error"])
+        self.assertEqual(results[5]["error"], "Insufficient funds.")
+        self.assertEqual(self.repository.find(1000000001)["account_balance"], 70.0)
+        self.assertEqual(self.repository.find(1000000002)["account_balance"], 30.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,122 @@
+import os
+import tempfile
+import unittest
+import uuid
+from unittest import mock
+
+import sharding
+from sharding import ShardedRepository, rebalance
+
+# One account per end of the number range: shards 0 and 1 of two, and shards
+# 0, 1 and 3 of four.
+ACCOUNTS = {1000000001: 100.0, 3000000000: 50.0, 5000000000: 25.0, 9000000000: 10.0}
+
+
+class ShardingTestCase(unittest.TestCase):
+    checkpoints = False
+
+    def setUp(self):
+        folder = tempfile.TemporaryDirectory()
+        self.addCleanup(folder.cleanup)
+        self.name_of_file = os.path.join(folder.name, "store.json")
+
+        store = self.open()
+        for position, (account_no, balance) in enumerate(ACCOUNTS.items()):
+            store.add({"name": "owner", "email": f"owner{position}@example.com",
+                       "account_number": account_no, "account_balance": 0})
+            store.deposit(store.find(account_no), balance)
+
+    def open(self, shards=2):
+        return ShardedRepository(name_of_file=self.name_of_file, shards=shards, checkpoints=self.checkpoints)
+
+    def balances(self, store):
+        return {account_no: store.find(account_no)["account_balance"] for account_no in ACCOUNTS}
+
+
+class TwoPhaseRecoveryTests(ShardingTestCase):
+    def crash_mid_transfer(self, decided):
+        # transfer() up to the point of a crash: both halves prepared and, if
+        # decided, the commit decision logged, but no shard told the outcome.
+        store = self.open()
+        sender, receiver = store.shards
+        txid = uuid.uuid4().hex
+        with sender.commit_lock, receiver.commit_lock:
+            sender.prepare(txid, [sender.balance(sender.find(1000000001), 60.0)])
+            receiver.prepare(txid, [receiver.balance(receiver.find(9000000000), 50.0)])
+            if decided:
+                with store.lock:
+                    store.coordinator.append({"commit": txid})
+                    store.coordinator.commits.sync_now()
+
+    def test_crash_after_prepare_aborts(self):
+        self.crash_mid_transfer(decided=False)
+        store = self.open()
+        self.assertEqual(self.balances(store), ACCOUNTS)
+        self.assertFalse(any(shard.pending for shard in store.shards))
+
+    def test_crash_after_decision_commits(self):
+        self.crash_mid_transfer(decided=True)
+        store = self.open()
+        self.assertEqual(self.balances(store), {**ACCOUNTS, 1000000001: 60.0, 9000000000: 50.0})
+        self.assertFalse(any(shard.pending for shard in store.shards))
+
+        # The outcome was written to the shards, not just worked out again.
+        self.assertEqual(self.balances(self.open()), self.balances(store))
+
+    def test_failed_prepare_aborts_the_prepared_half(self):
+        store = self.open()
+        sender, receiver = store.shards
+        with mock.patch.object(receiver, "prepare", side_effect=OSError("disk full")):
+            with self.assertRaises(OSError):
+                store.transfer(store.find(1000000001), store.find(9000000000), 40.0)
+        self.assertFalse(sender.pending)
+        self.assertEqual(self.balances(store), ACCOUNTS)
+        self.assertEqual(self.balances(self.open()), ACCOUNTS)
+
+
+class RebalanceTests(ShardingTestCase):
+    checkpoints = True
+
+    def setUp(self):
+        super().setUp()
+        # Every shard has a checkpoint older than its journal.
+        store = self.open()
+        for shard in store.shards:
+            shard.checkpoint(background=False)
+        store.deposit(store.find(9000000000), 5.0)
+        self.expected = {**ACCOUNTS, 9000000000: 15.0}
+
+    def assertRebalanced(self, shards):
+        store = self.open()
+        self.assertEqual(store.count, shards)
+        self.assertEqual(self.balances(store), self.expected)
+        self.assertEqual(sorted(user["account_number"] for user in store.accounts), sorted(ACCOUNTS))
+
+    def test_rebalance_moves_accounts_to_their_new_shards(self):
+        self.assertEqual(rebalance(self.name_of_file, 4, checkpoints=True), len(ACCOUNTS))
+        self.assertRebalanced(4)
+
+    def test_crash_mid_swap_is_finished_by_running_again(self):
+        replace = os.replace
+        swapped = []
+
+        def crash_after_first_shard(source, target):
+            # os is shared with every module, so only count the shard swaps.
+            if str(source).endswith(".new"):
+                if swapped:
+                    raise OSError("crash")
+                swapped.append(target)
+            replace(source, target)
+
+        with mock.patch.object(sharding.os, "replace", crash_after_first_shard):
+            with self.assertRaises(OSError):
+                rebalance(self.name_of_file, 4, checkpoints=True)
+
+        with self.assertRaises(RuntimeError):
+            self.open()
+        rebalance(self.name_of_file, 4, checkpoints=True)
+        self.assertRebalanced(4)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,44 +1,30 @@
-from model import Model
-
-
-class Transfer(Model):
-    def __init__(self):
-        self.accounts = self.load_a_file(name_of_file="store.json")
+class Transfer:
+    def __init__(self, repository):
+        self.repository = repository
 
     def run(self):
+        self.repository.refresh()
+
         print("Intra-MiBank Transfer")
         sender = input("enter your account number: ")
         receiver = input("enter receiver account number: ")
 
-        sender_found = False
-        receiver_found = False
+        sender_user = self.repository.find(sender)
+        receiver_user = self.repository.find(receiver)
 
-        for user in self.accounts:
-            if int(sender.strip()) == user['account_number']:
-                sender_user = user
-                sender_found = True
-            if int(receiver.strip()) == user['account_number']:
-                receiver_user = user
-                receiver_found = True
-
-        if not sender_found:
+        if sender_user is None:
             print(f"{'==' * 24}\nSender account not found.\n{'==' * 24}")
             return
 
-        if not receiver_found:
+        if receiver_user is None:
             print(f"{'==' * 24}\nReceiver account not found.\n{'==' * 24}")
             return
 
         amount = input("Enter amount to transfer: ")
 
-        if sender_user['account_balance'] < float(amount):
+        if not self.repository.transfer(sender_user, receiver_user, float(amount)):
             print(f"{'==' * 24}\nInsufficient funds.\n{'==' * 24}")
             return
 
-        sender_user['account_balance'] -= float(amount)
-        receiver_user['account_balance'] += float(amount)
-
-        self.save_a_file(name_of_file="store.json", content=self.accounts)
-
         print(
             f"{'==' * 24}\n{amount} has been transferred from {sender} to {receiver}.\n{'==' * 24}")
@@ -1,18 +1,16 @@
-from model import Model
-
-
-class ViewBalance(Model):
-    def __init__(self):
-        self.accounts = self.load_a_file(name_of_file="store.json")
+class ViewBalance:
+    def __init__(self, repository):
+        self.repository = repository
 
     def run(self):
+        self.repository.refresh()
+
         account_no = input("What is your account number: ")
 
-        for user in self.accounts:
-            if int(account_no) == user['account_number']:
-                print(
-                    f"{"==" * 24}\nYour account balance is {user['account_balance']}.\n{"==" * 24}")
-                break
-        else:
+        user = self.repository.find(account_no)
+        if user is None:
             print("No such account number was found.")
+            return
 
+        print(
+            f"{"==" * 24}\nYour account balance is {user['account_balance']}.\n{"==" * 24}")
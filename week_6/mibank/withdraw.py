@@ -1,26 +1,22 @@
-from model import Model
-
-
-class Withdraw(Model):
-    def __init__(self):
-        self.accounts = self.load_a_file(name_of_file="store.json")
+class Withdraw:
+    def __init__(self, repository):
+        self.repository = repository
 
     def run(self):
+        self.repository.refresh()
+
         account_no = input("What is your account number: ")
 
-        for user in self.accounts:
-            if int(account_no.strip()) == user['account_number']:
-                amount = input("How much do you want to withdraw?: ")
+        user = self.repository.find(account_no)
+        if user is None:
+            print("No such account number was found.")
+            return
 
-                if user['account_balance'] < float(amount):
-                    print(f"{"==" * 24}\nInsufficient funds.\n{"==" * 24}")
-                    break
+        amount = input("How much do you want to withdraw?: ")
 
-                user['account_balance'] -= float(amount)
-                self.save_a_file(name_of_file="store.json",
-                                 content=self.accounts)
-                print(
-                    f"{"==" * 24}\n{amount} has been withdrawn from your account.\n{"==" * 24}")
-                break
-        else:
-            print("No such account number was found.")
+        if not self.repository.withdraw(user, float(amount)):
+            print(f"{"==" * 24}\nInsufficient funds.\n{"==" * 24}")
+            return
+
+        print(
+            f"{"==" * 24}\n{amount} has been withdrawn from your account.\n{"==" * 24}")
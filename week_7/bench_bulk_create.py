@@ -0,0 +1,62 @@
+import argparse
+import json
+import os
+import tempfile
+import time
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "myproject.settings")
+
+import django
+from django.conf import settings
+
+
+def rows_of(count):
+    return [{"name": f"product {number}", "category": "fashion", "price": 10.0 + number % 100, "stock": number % 50,
+             "description": "a product for the bulk create benchmark", "is_available": number % 3 > 0}
+            for number in range(count)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load products one request at a time against bulk_create_product.")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[100, 500, 2000])
+    parser.add_argument("--single-rows", type=int, default=None,
+                        help="rows to send through created_product (default: all of them)")
+    arguments = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        settings.DATABASES["default"]["NAME"] = os.path.join(folder, "bench.sqlite3")
+        settings.DEBUG = False
+        django.setup()
+
+        from django.core.management import call_command
+        from django.test import Client
+
+        from market.models import Market_Product
+
+        call_command("migrate", verbosity=0)
+        client = Client()
+        rows = rows_of(arguments.rows)
+
+        print(f"{'path':>22} {'rows':>9} {'seconds':>9} {'rows/s':>10}")
+
+        single = rows[:arguments.single_rows or arguments.rows]
+        start = time.perf_counter()
+        for row in single:
+            client.post("/market/created_product/", json.dumps(row), content_type="application/json")
+        elapsed = time.perf_counter() - start
+        print(f"{'created_product':>22} {len(single):>9,} {elapsed:>9.2f} {len(single) / elapsed:>10,.0f}")
+
+        for batch_size in arguments.batch_sizes:
+            Market_Product.objects.all().delete()
+            body = "\n".join(json.dumps(row) for row in rows)
+            start = time.perf_counter()
+            response = client.post(f"/market/bulk_create_product/?batch_size={batch_size}", body,
+                                   content_type="application/x-ndjson")
+            elapsed = time.perf_counter() - start
+            assert response.status_code == 201, response.content
+            print(f"{f'bulk, batch {batch_size}':>22} {len(rows):>9,} {elapsed:>9.2f} {len(rows) / elapsed:>10,.0f}")
+
+
+if __name__ == "__main__":
+    main()
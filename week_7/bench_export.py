@@ -0,0 +1,80 @@
+import argparse
+import datetime
+import os
+import tempfile
+import time
+import tracemalloc
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "myproject.settings")
+
+import django
+from django.conf import settings
+
+
+def fill(count):
+    # Raw executemany: the ORM would spend longer building the table than the
+    # export takes to read it.
+    from django.db import connection, transaction
+
+    created_at = datetime.datetime.now(datetime.timezone.utc).isoformat()
+    rows = ((f"product {number}", "fashion", 10.0, 5, "a product for the export benchmark", True, created_at)
+            for number in range(count))
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.executemany("INSERT INTO market_market_product "
+                           "(name, category, price, stock, description, is_available, created_at) "
+                           "VALUES (%s, %s, %s, %s, %s, %s, %s)", rows)
+
+
+def measure(read):
+    tracemalloc.start()
+    start = time.perf_counter()
+    size = read()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return size, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Peak memory of the product export against a full listing.")
+    parser.add_argument("--products", type=int, nargs="+", default=[1_000, 10_000, 100_000, 1_000_000])
+    parser.add_argument("--listing-limit", type=int, default=1_000_000,
+                        help="skip the in-memory listing above this many products")
+    arguments = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        settings.DATABASES["default"]["NAME"] = os.path.join(folder, "bench.sqlite3")
+        settings.DEBUG = False
+        django.setup()
+
+        from django.core.management import call_command
+        from django.http import JsonResponse
+        from django.test import Client
+
+        from market.models import Market_Product
+
+        call_command("migrate", verbosity=0)
+        client = Client()
+
+        def export():
+            response = client.get("/market/export_products/?format=ndjson")
+            return sum(len(chunk) for chunk in response.streaming_content)
+
+        def listing():
+            # What a full read cost before: every row in a list, then one body.
+            response = JsonResponse({"products": list(Market_Product.objects.all().values())})
+            return len(response.content)
+
+        print(f"{'products':>10} {'mode':>8} {'seconds':>8} {'body (MB)':>10} {'peak (MB)':>10}")
+        filled = 0
+        for count in sorted(arguments.products):
+            fill(count - filled)
+            filled = count
+            modes = [("export", export)] + ([("listing", listing)] if count <= arguments.listing_limit else [])
+            for mode, read in modes:
+                size, elapsed, peak = measure(read)
+                print(f"{count:>10,} {mode:>8} {elapsed:>8.2f} {size / 1e6:>10.1f} {peak / 1e6:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "myproject.settings")
+
+import django
+from django.conf import settings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Queries and latency of product updates.")
+    parser.add_argument("--products", type=int, default=100_000)
+    parser.add_argument("--requests", type=int, default=2_000)
+    arguments = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        settings.DATABASES["default"]["NAME"] = os.path.join(folder, "bench.sqlite3")
+        settings.DEBUG = False
+        django.setup()
+
+        from django.core.management import call_command
+        from django.db import connection
+        from django.test import Client
+        from django.test.utils import CaptureQueriesContext
+
+        from market.models import Market_Product
+
+        call_command("migrate", verbosity=0)
+        Market_Product.objects.bulk_create(
+            [Market_Product(name=f"product {number}", category="fashion", price=10.0, stock=5,
+                            description="a product for the update benchmark", is_available=True)
+             for number in range(arguments.products)], batch_size=500)
+        ids = list(Market_Product.objects.values_list("id", flat=True))[:arguments.requests]
+        client = Client()
+
+        def full_save(id):
+            # A persisting version of the old handler: fetch the row, save it all.
+            product = Market_Product.objects.get(id=id)
+            product.stock = 3
+            product.save()
+
+        def patch(id):
+            client.patch(f"/market/update_product/{id}/", json.dumps({"stock": 4}), content_type="application/json")
+
+        def patch_view_only(id):
+            # The same UPDATE without the test client around it.
+            Market_Product.objects.filter(id=id).update(stock=4)
+
+        print(f"{'path':>26} {'queries/req':>12} {'p50 (us)':>10} {'mean (us)':>10}")
+        for name, update in (("get + save()", full_save), ("filter().update()", patch_view_only),
+                             ("PATCH update_product", patch)):
+            timings = []
+            with CaptureQueriesContext(connection) as queries:
+                for id in ids:
+                    start = time.perf_counter()
+                    update(id)
+                    timings.append(time.perf_counter() - start)
+            print(f"{name:>26} {len(queries) / len(ids):>12.1f} {statistics.median(timings) * 1e6:>10.0f} "
+                  f"{statistics.mean(timings) * 1e6:>10.0f}")
+
+        body = json.dumps([{"id": id, "stock": 6} for id in ids])
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            response = client.patch("/market/bulk_update_product/", body, content_type="application/json")
+            elapsed = time.perf_counter() - start
+        assert response.json()["updated"] == len(ids), response.content
+        print(f"{'bulk_update_product':>26} {len(queries):>12} queries for {len(ids):,} products, {elapsed:.2f}s "
+              f"({elapsed / len(ids) * 1e6:.0f} us per product)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("market", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="market_product",
+            name="description",
+            field=models.TextField(),
+        ),
+        migrations.AddIndex(
+            model_name="market_product",
+            index=models.Index(
+                fields=["created_at", "id"], name="market_created_id_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("market", "0002_market_product_created_id_index"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="market_product",
+            index=models.Index(
+                fields=["category", "is_available"], name="market_category_avail_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="market_product",
+            index=models.Index(
+                fields=["is_available", "price"], name="market_avail_price_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="market_product",
+            index=models.Index(fields=["price"], name="market_price_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="market_product",
+            index=models.Index(fields=["stock"], name="market_stock_idx"),
+        ),
+    ]
@@ -19,5 +19,17 @@ class Market_Product(models.Model):
     is_available = models.BooleanField()
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Keyset pagination in get_product walks this index in order.
+            models.Index(fields=["created_at", "id"], name="market_created_id_idx"),
+            # Filters in get_product. A composite index also serves a filter on
+            # its first column alone.
+            models.Index(fields=["category", "is_available"], name="market_category_avail_idx"),
+            models.Index(fields=["is_available", "price"], name="market_avail_price_idx"),
+            models.Index(fields=["price"], name="market_price_idx"),
+            models.Index(fields=["stock"], name="market_stock_idx"),
+        ]
+
     def __str__(self):
         return self.name
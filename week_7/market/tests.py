@@ -1,3 +1,272 @@
+import json
+from unittest.mock import patch
+
+from django.db import connection
 from django.test import TestCase
 
-# Create your tests here.
+from .models import Market_Product
+from .views import EXPORT_CHUNK
+
+
+def make_products(count, **fields):
+    defaults = {"category": "fashion", "price": 10.0, "stock": 5, "description": "", "is_available": True}
+    defaults.update(fields)
+    return Market_Product.objects.bulk_create(
+        [Market_Product(name=f"product {number}", **defaults) for number in range(count)])
+
+
+def query_plans(client, url):
+    # The SQLite EXPLAIN QUERY PLAN of every product query the request runs.
+    plans = []
+
+    def explain(execute, sql, params, many, context):
+        if sql.startswith("SELECT") and "market_market_product" in sql:
+            with connection.cursor() as cursor:
+                cursor.execute("EXPLAIN QUERY PLAN " + sql, params)
+                plans.append(" ".join(row[-1] for row in cursor.fetchall()))
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(explain):
+        client.get(url)
+    return plans
+
+
+class GetProductPaginationTests(TestCase):
+    def test_pages_cover_every_product_once_in_order(self):
+        make_products(25)
+
+        seen = []
+        cursor = None
+        while True:
+            url = "/market/get_product/?limit=10" + (f"&cursor={cursor}" if cursor else "")
+            body = self.client.get(url).json()
+            seen += [product["id"] for product in body["products"]]
+            cursor = body["next_cursor"]
+            if cursor is None:
+                break
+
+        expected = list(Market_Product.objects.order_by("created_at", "id").values_list("id", flat=True))
+        self.assertEqual(seen, expected)
+
+    def test_last_page_has_no_cursor(self):
+        make_products(3)
+        body = self.client.get("/market/get_product/?limit=3").json()
+        self.assertEqual(len(body["products"]), 3)
+        self.assertIsNone(body["next_cursor"])
+
+    def test_bad_cursor_is_rejected(self):
+        response = self.client.get("/market/get_product/?cursor=not-a-cursor")
+        self.assertEqual(response.status_code, 400)
+
+    def test_page_seeks_through_the_index(self):
+        make_products(3)
+        cursor = self.client.get("/market/get_product/?limit=1").json()["next_cursor"]
+
+        plans = query_plans(self.client, f"/market/get_product/?limit=1&cursor={cursor}")
+        self.assertTrue(any("market_created_id_idx" in plan for plan in plans), plans)
+        self.assertFalse(any("TEMP B-TREE" in plan for plan in plans), plans)
+
+
+class GetProductFilterTests(TestCase):
+    def setUp(self):
+        make_products(4, category="fashion", price=5.0, stock=0, is_available=False)
+        make_products(3, category="electronics", price=50.0, stock=20)
+        make_products(2, category="accessories", price=500.0, stock=2)
+
+    def products_for(self, query):
+        return self.client.get("/market/get_product/?" + query).json()["products"]
+
+    def test_filters_narrow_the_products(self):
+        self.assertEqual(len(self.products_for("category=electronics")), 3)
+        self.assertEqual(len(self.products_for("is_available=false")), 4)
+        self.assertEqual(len(self.products_for("min_price=10&max_price=100")), 3)
+        self.assertEqual(len(self.products_for("min_stock=1")), 5)
+        self.assertEqual(len(self.products_for("max_stock=2&is_available=true")), 2)
+        self.assertEqual(len(self.products_for("category=fashion&is_available=true")), 0)
+
+    def test_bad_filter_is_rejected(self):
+        self.assertEqual(self.client.get("/market/get_product/?is_available=maybe").status_code, 400)
+        self.assertEqual(self.client.get("/market/get_product/?min_price=cheap").status_code, 400)
+        for query in ("min_stock=" + "1" * 31, "min_price=nan", "max_price=inf", "max_stock=-" + "9" * 20):
+            with self.subTest(query=query):
+                self.assertEqual(self.client.get("/market/get_product/?" + query).status_code, 400)
+
+    def test_every_filter_searches_an_index(self):
+        queries = [
+            "category=fashion",
+            "is_available=true",
+            "min_price=10",
+            "min_price=10&max_price=100",
+            "max_stock=3",
+            "min_stock=1&max_stock=3",
+            "category=fashion&is_available=true",
+            "category=fashion&min_price=10",
+            "is_available=true&min_price=10&max_price=100",
+            "is_available=true&max_stock=3",
+            "category=fashion&is_available=true&min_price=10&min_stock=1",
+        ]
+        for query in queries:
+            with self.subTest(query=query):
+                plans = query_plans(self.client, "/market/get_product/?" + query)
+                # SEARCH means SQLite seeks into an index; a full table or full
+                # index walk shows up as SCAN.
+                self.assertTrue(plans, query)
+                self.assertTrue(all("SEARCH market_market_product USING INDEX" in plan for plan in plans), plans)
+
+
+class ExportProductsTests(TestCase):
+    def setUp(self):
+        # More than one chunk, with a short last one.
+        make_products(EXPORT_CHUNK + 5)
+        make_products(3, category="electronics")
+
+    def test_json_array_holds_every_product(self):
+        response = self.client.get("/market/export_products/")
+        self.assertTrue(response.streaming)
+        products = json.loads(b"".join(response.streaming_content))
+        self.assertEqual([product["id"] for product in products],
+                         list(Market_Product.objects.order_by("id").values_list("id", flat=True)))
+
+    def test_ndjson_is_one_product_per_line(self):
+        response = self.client.get("/market/export_products/?format=ndjson&category=electronics")
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual([json.loads(line)["category"] for line in lines], ["electronics"] * 3)
+
+    def test_empty_export_is_an_empty_array(self):
+        response = self.client.get("/market/export_products/?category=accessories")
+        self.assertEqual(json.loads(b"".join(response.streaming_content)), [])
+
+    def test_unknown_format_is_rejected(self):
+        self.assertEqual(self.client.get("/market/export_products/?format=xml").status_code, 400)
+
+
+class BulkCreateProductTests(TestCase):
+    row = {"name": "lamp", "category": "electronics", "price": 20.0, "stock": 3, "description": "A desk lamp",
+           "is_available": True}
+
+    def post(self, body, content_type="application/json", query=""):
+        return self.client.post("/market/bulk_create_product/" + query, body, content_type=content_type)
+
+    def test_json_array_creates_every_row(self):
+        response = self.post(json.dumps([self.row] * 7), query="?batch_size=3")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()["created"], 7)
+        self.assertEqual(Market_Product.objects.count(), 7)
+
+    def test_ndjson_creates_every_row(self):
+        body = "\n".join(json.dumps(self.row) for _ in range(4)) + "\n"
+        response = self.post(body, content_type="application/x-ndjson")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Market_Product.objects.count(), 4)
+
+    def test_bad_rows_are_reported_and_nothing_is_created(self):
+        rows = [self.row, dict(self.row, category="toys"), {"name": "half"}, dict(self.row, price="free")]
+        response = self.post(json.dumps(rows))
+        self.assertEqual(response.status_code, 400)
+        errors = response.json()["errors"]
+        self.assertEqual([error["row"] for error in errors], [1, 2, 3])
+        self.assertIn("category", errors[0]["errors"])
+        self.assertIn("price", errors[1]["errors"])
+        self.assertIn("price", errors[2]["errors"])
+        self.assertEqual(Market_Product.objects.count(), 0)
+
+    def test_unparsable_ndjson_line_is_a_row_error(self):
+        body = json.dumps(self.row) + "\n{not json\n"
+        response = self.post(body, content_type="application/x-ndjson")
+        self.assertEqual(response.json()["errors"], [{"row": 1, "errors": {"row": ["Not valid JSON."]}}])
+
+    def test_one_insert_per_batch(self):
+        with self.assertNumQueries(5):
+            # The savepoint, three INSERTs and the release.
+            self.post(json.dumps([self.row] * 7), query="?batch_size=3")
+
+    def test_too_many_rows_is_too_large(self):
+        with patch("market.views.MAX_BULK_ROWS", 2):
+            response = self.post(json.dumps([self.row] * 3))
+        self.assertEqual(response.status_code, 413)
+        self.assertEqual(Market_Product.objects.count(), 0)
+
+    def test_oversized_body_is_too_large(self):
+        with patch("market.views.MAX_BULK_BYTES", 100):
+            response = self.post(json.dumps([self.row] * 3))
+        self.assertEqual(response.status_code, 413)
+
+
+class UpdateProductTests(TestCase):
+    def setUp(self):
+        self.product = make_products(1, description="A desk lamp")[0]
+
+    def send(self, method, body, id=None):
+        return self.client.generic(method, f"/market/update_product/{id or self.product.id}/", json.dumps(body),
+                                   content_type="application/json")
+
+    def test_put_persists_the_product(self):
+        response = self.send("PUT", {"name": "lamp", "category": "electronics", "price": 20.0, "stock": 9,
+                                     "description": "A brighter lamp"})
+        self.assertEqual(response.status_code, 200)
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.name, self.product.stock), ("lamp", 9))
+
+    def test_put_needs_every_field(self):
+        self.assertEqual(self.send("PUT", {"stock": 9}).status_code, 400)
+
+    def test_patch_is_one_update_of_the_fields_sent(self):
+        with self.assertNumQueries(1):
+            response = self.send("PATCH", {"stock": 1, "price": "12.5"})
+        self.assertEqual(response.status_code, 200)
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.stock, self.product.price, self.product.name), (1, 12.5, "product 0"))
+
+    def test_patch_of_missing_product_is_not_found(self):
+        self.assertEqual(self.send("PATCH", {"stock": 1}, id=self.product.id + 1).status_code, 404)
+
+    def test_patch_rejects_bad_fields(self):
+        response = self.send("PATCH", {"category": "toys", "colour": "red"})
+        self.assertEqual(set(response.json()["errors"]), {"category", "colour"})
+
+
+class BulkUpdateProductTests(TestCase):
+    def setUp(self):
+        self.products = make_products(5, description="A desk lamp")
+
+    def patch(self, rows):
+        return self.client.patch("/market/bulk_update_product/", json.dumps(rows), content_type="application/json")
+
+    def test_updates_many_products(self):
+        rows = [{"id": product.id, "stock": 0} for product in self.products[:3]]
+        rows.append({"id": self.products[3].id, "price": 99.0})
+        with self.assertNumQueries(5):
+            # The savepoint, the id lookup, one UPDATE per set of fields, and
+            # the release.
+            response = self.patch(rows)
+        self.assertEqual(response.json()["updated"], 4)
+        self.assertEqual(list(Market_Product.objects.order_by("id").values_list("stock", flat=True)), [0, 0, 0, 5, 5])
+        self.assertEqual(Market_Product.objects.get(id=self.products[3].id).price, 99.0)
+
+    def test_bad_row_updates_nothing(self):
+        response = self.patch([{"id": self.products[0].id, "stock": 0}, {"stock": 1}, {"id": self.products[1].id}])
+        self.assertEqual([error["row"] for error in response.json()["errors"]], [1, 2])
+        self.assertFalse(Market_Product.objects.filter(stock=0).exists())
+
+    def test_boolean_id_is_rejected(self):
+        response = self.patch([{"id": True, "stock": 0}])
+        self.assertEqual(response.json()["errors"][0]["errors"], {"id": ["A product id is required."]})
+
+    def test_missing_ids_are_reported_and_nothing_is_updated(self):
+        missing = self.products[-1].id + 1
+        response = self.patch([{"id": self.products[0].id, "stock": 0}, {"id": missing, "stock": 0}])
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.json()["missing"], [missing])
+        self.assertFalse(Market_Product.objects.filter(stock=0).exists())
+
+    def test_repeated_id_is_rejected(self):
+        id = self.products[0].id
+        response = self.patch([{"id": id, "stock": 1}, {"id": id, "stock": 2}])
+        self.assertEqual([error["row"] for error in response.json()["errors"]], [1])
+        self.assertEqual(Market_Product.objects.get(id=id).stock, 5)
+
+    def test_id_out_of_range_is_rejected(self):
+        response = self.patch([{"id": 10**30, "stock": 1}, {"id": 0, "stock": 1}])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([error["row"] for error in response.json()["errors"]], [0, 1])
@@ -3,7 +3,10 @@ from market import views
 
 urlpatterns = [
     path('get_product/', views.get_product, name='get-product'),
+    path('export_products/', views.export_products, name='export-products'),
     path('created_product/', views.create_product, name='create-product'),
+    path('bulk_create_product/', views.bulk_create_product, name='bulk-create-product'),
     path('update_product/<int:id>/', views.update_product, name='update-product'),
+    path('bulk_update_product/', views.bulk_update_product, name='bulk-update-product'),
     path('delete_product/<int:id>/', views.delete_product, name='delete-product'),
 ]
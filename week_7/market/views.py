@@ -1,15 +1,141 @@
-from django.http import JsonResponse
+from django.core.serializers.json import DjangoJSONEncoder
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Q
+from django.http import JsonResponse, StreamingHttpResponse
 from .models import Market_Product
+import base64
+import datetime
 import json
+import math
+
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+# Rows fetched from the database, and written to the response, at a time.
+EXPORT_CHUNK = 2000
+# Rows per INSERT in bulk_create_product, unless the request asks otherwise.
+BULK_BATCH = 500
+# Largest body, and most rows, one bulk_create_product request may send.
+MAX_BULK_BYTES = 32 * 1024 * 1024
+MAX_BULK_ROWS = 100_000
+# Largest id the database can hold.
+MAX_ID = 2**63 - 1
+PRODUCT_FIELDS = ("name", "category", "price", "stock", "description", "is_available")
+
+
+def encode_cursor(product):
+    # The cursor is the (created_at, id) of the last product on the page,
+    # base64 encoded so clients treat it as an opaque token.
+    position = json.dumps([product["created_at"].isoformat(), product["id"]])
+    return base64.urlsafe_b64encode(position.encode()).decode()
+
+
+def decode_cursor(cursor):
+    created_at, id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    return datetime.datetime.fromisoformat(created_at), int(id)
+
+
+# Open ends for the min_/max_ filters on each numeric field.
+RANGES = {
+    "price": (float, -math.inf, math.inf),
+    "stock": (int, -2**63, 2**63 - 1),
+}
+
+
+def product_filters(query):
+    # Filters for get_product: category, is_available, min_/max_price and
+    # min_/max_stock. Raises ValueError or KeyError on a value that does not
+    # convert.
+    lookups = {}
+    if "category" in query:
+        lookups["category"] = query["category"]
+    if "is_available" in query:
+        # is_available=True compiles to a bare column test, which SQLite will
+        # not look up in an index; IN (1) it will.
+        lookups["is_available__in"] = [{"true": True, "false": False}[query["is_available"].lower()]]
+    for field, (convert, lowest, highest) in RANGES.items():
+        low, high = query.get(f"min_{field}"), query.get(f"max_{field}")
+        if low is not None or high is not None:
+            # Always bounded on both sides: SQLite guesses a one-sided bound
+            # keeps a quarter of the table and would rather walk created_at.
+            lookups[f"{field}__range"] = (lowest if low is None else bounded(convert(low), lowest, highest),
+                                          highest if high is None else bounded(convert(high), lowest, highest))
+    return lookups
+
+
+def bounded(number, lowest, highest):
+    # NaN fails both comparisons; an infinite bound is only the open end.
+    if not lowest <= number <= highest or number in (-math.inf, math.inf):
+        raise ValueError(f"{number} is out of range")
+    return number
 
 
 def get_product(request):
     # print(request.method)
     if request.method == "GET":
-        category = request.GET.get("category")
+        try:
+            lookups = product_filters(request.GET)
+        except (ValueError, KeyError):
+            return JsonResponse({"message": "Invalid filter"}, status=400)
+
+        try:
+            limit = min(int(request.GET.get("limit", PAGE_SIZE)), MAX_PAGE_SIZE)
+            cursor = request.GET.get("cursor")
+            after = decode_cursor(cursor) if cursor else None
+        except (ValueError, TypeError):
+            return JsonResponse({"message": "Invalid limit or cursor"}, status=400)
+        if limit < 1:
+            return JsonResponse({"message": "Invalid limit or cursor"}, status=400)
+
+        # Keyset pagination: seek past the last product seen instead of using an
+        # offset, so a deep page costs the same as the first one.
+        products = Market_Product.objects.filter(**lookups).order_by("created_at", "id")
+        if after is not None:
+            created_at, id = after
+            products = products.filter(Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=id),
+                                       created_at__gte=created_at)
 
-        all_products = Market_Product.objects.all().values()
-        return JsonResponse({"message": "Get product Successful", "products": list(all_products)})
+        # One extra row tells whether there is a next page.
+        page = list(products.values()[:limit + 1])
+        next_cursor = encode_cursor(page[limit - 1]) if len(page) > limit else None
+        return JsonResponse({"message": "Get product Successful", "products": page[:limit],
+                             "next_cursor": next_cursor})
+    else:
+        return JsonResponse({"message": "You are using the wrong method"}, status=405)
+
+
+def stream_products(products, ndjson):
+    # Encodes products as they come off the cursor, EXPORT_CHUNK at a time,
+    # so memory stays the same whatever the size of the table.
+    encoder = DjangoJSONEncoder()
+    if not ndjson:
+        yield "["
+    batch = []
+    for count, product in enumerate(products):
+        text = encoder.encode(product)
+        batch.append(text + "\n" if ndjson else ("," if count else "") + text)
+        if len(batch) == EXPORT_CHUNK:
+            yield "".join(batch)
+            batch = []
+    yield "".join(batch) + ("" if ndjson else "]")
+
+
+def export_products(request):
+    # Every product matching the get_product filters, in id order, as one
+    # JSON array or (format=ndjson) one product per line.
+    if request.method == "GET":
+        try:
+            lookups = product_filters(request.GET)
+        except (ValueError, KeyError):
+            return JsonResponse({"message": "Invalid filter"}, status=400)
+        format = request.GET.get("format", "json")
+        if format not in ("json", "ndjson"):
+            return JsonResponse({"message": "Format must be json or ndjson"}, status=400)
+
+        products = Market_Product.objects.filter(**lookups).order_by("id").values()
+        content_type = "application/x-ndjson" if format == "ndjson" else "application/json"
+        return StreamingHttpResponse(stream_products(products.iterator(chunk_size=EXPORT_CHUNK), format == "ndjson"),
+                                     content_type=content_type)
     else:
         return JsonResponse({"message": "You are using the wrong method"}, status=405)
 
@@ -33,27 +159,178 @@ def create_product(request):
         return JsonResponse({"message": "You are using the wrong method"}, status=405)
 
 
+def parse_rows(text, content_type):
+    # A JSON array, or NDJSON (Content-Type application/x-ndjson) with one
+    # product per line. Returns the rows and the errors of lines that do not
+    # parse; raises ValueError on a bad array.
+    if content_type != "application/x-ndjson":
+        return json.loads(text), {}
+
+    rows, errors = [], {}
+    for number, line in enumerate(line for line in text.splitlines() if line.strip()):
+        try:
+            rows.append(json.loads(line))
+        except ValueError:
+            rows.append(None)
+            errors[number] = {"row": ["Not valid JSON."]}
+    return rows, errors
+
+
+def build_product(row):
+    # An unsaved Market_Product, or the model's validation errors for the row.
+    if not isinstance(row, dict):
+        return None, {"row": ["Must be a JSON object."]}
+    missing = [field for field in PRODUCT_FIELDS if field not in row]
+    if missing:
+        return None, {field: ["This field is required."] for field in missing}
+
+    product = Market_Product(**{field: row[field] for field in PRODUCT_FIELDS})
+    try:
+        product.full_clean(validate_unique=False, validate_constraints=False)
+    except ValidationError as error:
+        return None, error.message_dict
+    return product, None
+
+
+def bulk_create_product(request):
+    # Creates every product in the body in one transaction, or none of them:
+    # all rows are validated first and any errors are returned by row number.
+    if request.method == "POST":
+        # Read past DATA_UPLOAD_MAX_MEMORY_SIZE, which is sized for forms, but
+        # only up to this endpoint's own limits: every row is held in memory.
+        body = request.read(MAX_BULK_BYTES + 1)
+        if len(body) > MAX_BULK_BYTES:
+            return JsonResponse({"message": f"Body is larger than {MAX_BULK_BYTES} bytes"}, status=413)
+
+        try:
+            batch_size = int(request.GET.get("batch_size", BULK_BATCH))
+            rows, errors = parse_rows(body.decode(), request.content_type)
+        except ValueError:
+            return JsonResponse({"message": "Invalid batch size or JSON body"}, status=400)
+        if batch_size < 1 or not isinstance(rows, list):
+            return JsonResponse({"message": "Invalid batch size or JSON body"}, status=400)
+        if len(rows) > MAX_BULK_ROWS:
+            return JsonResponse({"message": f"More than {MAX_BULK_ROWS} products"}, status=413)
+
+        products = []
+        for number, row in enumerate(rows):
+            if number in errors:
+                continue
+            product, row_errors = build_product(row)
+            if row_errors:
+                errors[number] = row_errors
+            else:
+                products.append(product)
+        if errors:
+            return JsonResponse({"message": "No product created",
+                                 "errors": [{"row": number, "errors": errors[number]} for number in sorted(errors)]},
+                                status=400)
+
+        with transaction.atomic():
+            Market_Product.objects.bulk_create(products, batch_size=batch_size)
+        return JsonResponse({"message": "Products created successful", "created": len(products)}, status=201)
+    else:
+        return JsonResponse({"message": "You are using the wrong method"}, status=405)
+
+
+def clean_changes(row):
+    # The validated values of the product fields in `row`, and errors for the
+    # ones that do not validate or are not product fields.
+    if not isinstance(row, dict):
+        return {}, {"row": ["Must be a JSON object."]}
+    changes, errors = {}, {}
+    for name, value in row.items():
+        if name not in PRODUCT_FIELDS:
+            errors[name] = ["Not a product field."]
+            continue
+        try:
+            changes[name] = Market_Product._meta.get_field(name).clean(value, None)
+        except ValidationError as error:
+            errors[name] = error.messages
+    return changes, errors
+
+
 def update_product(request, id):
-    if request.method == "PUT":
+    # PUT needs the fields it always has; PATCH any of them. Either way only
+    # the fields sent are written, in one UPDATE with no SELECT first.
+    if request.method in ("PUT", "PATCH"):
         try:
-            existing_product = Market_Product.objects.get(id=id)
-        except Market_Product.DoesNotExist:
-            return JsonResponse({"message": "What You are looking for does nor exist"}, status=404)
+            to_dict = json.loads(request.body.decode())
+        except ValueError:
+            return JsonResponse({"message": "Invalid JSON body"}, status=400)
 
-        incoming_data = request.body.decode()
-        to_dict = json.loads(incoming_data)
+        changes, errors = clean_changes(to_dict)
+        if request.method == "PUT":
+            for field in ("name", "category", "price", "stock", "description"):
+                if field not in changes and field not in errors:
+                    errors[field] = ["This field is required."]
+        if errors:
+            return JsonResponse({"message": "Invalid product", "errors": errors}, status=400)
+        if not changes:
+            return JsonResponse({"message": "Nothing to update"}, status=400)
 
-        existing_product.name = to_dict["name"]
-        existing_product.category = to_dict["category"]
-        existing_product.price = to_dict["price"]
-        existing_product.stock = to_dict["stock"]
-        existing_product.description = to_dict["description"]
+        if not Market_Product.objects.filter(id=id).update(**changes):
+            return JsonResponse({"message": "What You are looking for does nor exist"}, status=404)
 
         return JsonResponse({"message": "Product update successful"})
     else:
         return JsonResponse({"message": "You are using the wrong method"}, status=405)
 
 
+def bulk_update_product(request):
+    # A JSON array of {"id", ...fields}. Rows changing the same fields share
+    # one bulk_update, which writes BULK_BATCH of them per UPDATE. Nothing is
+    # updated if any row is invalid.
+    if request.method == "PATCH":
+        try:
+            rows = json.loads(request.body.decode())
+        except ValueError:
+            return JsonResponse({"message": "Invalid JSON body"}, status=400)
+        if not isinstance(rows, list):
+            return JsonResponse({"message": "Invalid JSON body"}, status=400)
+
+        groups, errors, ids = {}, {}, set()
+        for number, row in enumerate(rows):
+            row = dict(row) if isinstance(row, dict) else row
+            id = row.pop("id", None) if isinstance(row, dict) else None
+            changes, row_errors = clean_changes(row)
+            if type(id) is not int or not 1 <= id <= MAX_ID:
+                row_errors["id"] = ["A product id is required."]
+            elif id in ids:
+                # bulk_update would keep only one of them.
+                row_errors["id"] = ["This id is already updated by an earlier row."]
+            elif not changes and not row_errors:
+                row_errors["row"] = ["Nothing to update."]
+            if type(id) is int:
+                ids.add(id)
+            if row_errors:
+                errors[number] = row_errors
+            else:
+                groups.setdefault(tuple(sorted(changes)), []).append(Market_Product(id=id, **changes))
+        if errors:
+            return JsonResponse({"message": "No product updated",
+                                 "errors": [{"row": number, "errors": errors[number]} for number in sorted(errors)]},
+                                status=400)
+
+        # bulk_update skips ids that do not exist without saying which, so
+        # look them up first, BULK_BATCH at a time.
+        ids = sorted(product.id for products in groups.values() for product in products)
+        with transaction.atomic():
+            found = set()
+            for start in range(0, len(ids), BULK_BATCH):
+                found.update(Market_Product.objects.filter(id__in=ids[start:start + BULK_BATCH])
+                             .values_list("id", flat=True))
+            missing = [id for id in ids if id not in found]
+            if missing:
+                return JsonResponse({"message": "No product updated", "missing": missing}, status=404)
+
+            updated = sum(Market_Product.objects.bulk_update(products, fields, batch_size=BULK_BATCH)
+                          for fields, products in groups.items())
+        return JsonResponse({"message": "Products update successful", "updated": updated})
+    else:
+        return JsonResponse({"message": "You are using the wrong method"}, status=405)
+
+
 def delete_product(request, id):
     if request.method == "DELETE":
         try: